@@ -1,7 +1,7 @@
 from .PredictionFinder import PredictionFinder
 from .PredictionVerifier import PredictionVerifier
 from .PredictionProfiler import PredictionProfiler
-import asyncio
+from .HttpClient import http_client, LLM_TIMEOUT
 from typing import List
 import os 
 from openai import OpenAI
@@ -27,7 +27,9 @@ OPEN_AI_URL = os.environ.get("OPEN_AI_URL","https://api.openai.com/v1")
 
 client = OpenAI(
     base_url=OPEN_AI_URL,
-    api_key=OPEN_AI_KEY
+    api_key=OPEN_AI_KEY,
+    timeout=LLM_TIMEOUT,
+    http_client=http_client.sync_client
 )
 
 # ============ AUTOGEN INTEGRATION ============
@@ -39,30 +41,30 @@ prediction_verifier = PredictionVerifier(client, NEWS_API_TOKEN, GOOGLE_API_KEY,
 def find_predictions_wrapper(user_prompt: str):
     """Wrapper for the find_predictions function"""
     print("Finding predictions...")
-    return asyncio.run(prediction_finder.find_predictions(user_prompt))
+    return http_client.run(prediction_finder.find_predictions(user_prompt))
 
 """
 def build_profiles_wrapper(handles: List[str]):
     # Wrapper for the build_profiles function
     print("Building profiles...")
-    return asyncio.run(predictor_profiler.build_profiles(handles))
+    return http_client.run(predictor_profiler.build_profiles(handles))
 """
 
 
 def build_profiles_wrapper(handles: List[str]):
     # Wrapper for the build_profiles function
     print("Building profiles...")
-    return asyncio.run(predictor_profiler.get_profiles(handles))
+    return http_client.run(predictor_profiler.get_profiles(handles))
 
 def  calculate_credibility_scores_batch_wrapper(handles: List[str]):
     print("Calculating credibility scores for batch...")
     """Wrapper for the calculate_credibility_scores_batch function"""
-    return asyncio.run(predictor_profiler.calculate_credibility_scores_batch(handles, prediction_verifier))
+    return http_client.run(predictor_profiler.calculate_credibility_scores_batch(handles, prediction_verifier))
 
 def verify_prediction_wrapper(prediction: str):
     print("Verifying prediction...")    
     """Wrapper for the verify_prediction function"""
-    return prediction_verifier.verify_prediction(prediction)
+    return http_client.run(prediction_verifier.verify_prediction(prediction))
 
 if __name__ == "__main__":
     #find_predictions_wrapper("Given me predictions on Will trump lower tariffs on china in april?")
@@ -0,0 +1,182 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+import diskcache
+
+logger = logging.getLogger("app")
+
+# Directory for the persistent (on-disk) cache tier
+CACHE_DIR = os.environ.get("CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"))
+CACHE_DISK_SIZE_LIMIT = int(os.environ.get("CACHE_DISK_SIZE_LIMIT", str(256 * 1024 * 1024)))
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different strings share a key."""
+    return re.sub(r"\s+", " ", (text or "")).strip().lower()
+
+
+def make_key(*parts: Any) -> str:
+    """Build a stable cache key from JSON-serialisable parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with TTL expiry and an optional on-disk tier.
+
+    The memory tier holds at most `maxsize` entries and evicts the least
+    recently used one. With `persist=True` every entry is also written to a
+    diskcache store under CACHE_DIR/<name>, so it survives restarts. A `ttl`
+    of 0 or less means entries never expire.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 3600, persist: bool = False):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if persist:
+            try:
+                self._disk = diskcache.Cache(
+                    os.path.join(CACHE_DIR, name),
+                    size_limit=CACHE_DISK_SIZE_LIMIT,
+                    eviction_policy="least-recently-used",
+                )
+            except Exception as e:
+                logger.error(f"Could not open disk cache {name}, using memory only: {e}")
+
+    def _expiry(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() + ttl if ttl and ttl > 0 else None
+
+    def _store(self, key: str, value: Any, expires_at: Optional[float]):
+        self._entries[key] = (expires_at, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(value)
+                del self._entries[key]
+
+        if self._disk is not None:
+            try:
+                value, expires_at = self._disk.get(key, default=None, expire_time=True)
+            except Exception as e:
+                logger.error(f"Disk cache {self.name} read failed: {e}")
+                value = None
+            if value is not None:
+                with self._lock:
+                    self._store(key, value, expires_at)
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value; `ttl` overrides the cache default for this entry."""
+        expires_at = self._expiry(ttl)
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self._disk is not None:
+            try:
+                self._disk.set(key, value, expire=expires_at - time.time() if expires_at else None)
+            except Exception as e:
+                logger.error(f"Disk cache {self.name} write failed: {e}")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Batch lookup; returns only the keys that were found."""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        for key, value in items.items():
+            self.set(key, value, ttl=ttl)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self._disk is not None:
+            try:
+                self._disk.delete(key)
+            except Exception as e:
+                logger.error(f"Disk cache {self.name} delete failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"name": self.name, "size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Classification labels never go stale on their own; the version in the key handles prompt/model changes
+LABEL_CACHE_TTL = float(os.environ.get("LABEL_CACHE_TTL", "0"))
+LABEL_CACHE_SIZE = int(os.environ.get("LABEL_CACHE_SIZE", "20000"))
+
+_label_store = None
+_label_store_lock = threading.Lock()
+
+
+class LabelCache:
+    """Persistent tweet-text -> "Yes"/"No" label store for one classification prompt.
+
+    Keys combine the normalized tweet text with `version` (a hash of the
+    prompt and model), so changing either automatically starts a fresh
+    namespace. All LabelCaches share one on-disk store.
+    """
+
+    def __init__(self, version: str):
+        self.version = version
+
+    @property
+    def store(self) -> TTLCache:
+        global _label_store
+        with _label_store_lock:
+            if _label_store is None:
+                _label_store = TTLCache("tweet_labels", maxsize=LABEL_CACHE_SIZE, ttl=LABEL_CACHE_TTL, persist=True)
+            return _label_store
+
+    def key(self, text: str) -> str:
+        return make_key(self.version, normalize_text(text))
+
+    def lookup(self, texts: List[str]) -> Dict[int, str]:
+        """Batch lookup; returns {index: label} for the texts already classified."""
+        keys = [self.key(text) for text in texts]
+        found = self.store.get_many(set(keys))
+        return {i: found[key] for i, key in enumerate(keys) if key in found}
+
+    def save(self, texts: List[str], labels: List[str]):
+        self.store.set_many({
+            self.key(text): label
+            for text, label in zip(texts, labels)
+            if label in ("Yes", "No")
+        })
@@ -5,6 +5,7 @@ import pymongo
 import sys
 import logging
 import unittest
+from .Cache import TTLCache
 
 
 dotenv_path = "C:\Amit_Laptop_backup\Imperial_essentials\AI Society\Hackathon Torus\.env"
@@ -21,6 +22,13 @@ logger = logging.getLogger("app")
 
 MongodbClient = os.environ.get("MongodbClient")
 
+# In-process cache of profile documents in front of MongoDB
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL", "300"))
+PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", "512"))
+
+# Summary fields of a Credibility document (everything but the per-prediction "seen" history)
+CREDIBILITY_FIELDS = ["handle", "version", "counts", "weights", "last_update", "credibility_score", "decayed_score"]
+
 class Database():
 
     def __init__(self):
@@ -33,6 +41,16 @@ class Database():
 
         self.mongo_collection = self.db[self.collection_name]
 
+        # Saved topic queries for incremental find_predictions sweeps
+        self.saved_queries = self.db["SavedQueries"]
+
+        # Hot handles are served from memory; writes invalidate their entry
+        self.profile_cache = TTLCache("profiles", maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+        # Running per-handle credibility, updated as each verification finishes
+        self.credibility = self.db["Credibility"]
+        self._credibility_indexed = False
+
 
     def insert_profile(self,profile):
         handle = profile["handle"]
@@ -47,7 +65,10 @@ class Database():
             "prediction_tweets": prediction_tweets,
             "prediction_count": prediction_count,
             "prediction_rate": prediction_rate,
-            "analysis": analysis
+            "analysis": analysis,
+            # Let later refreshes fetch only newer tweets
+            "newest_tweet_id": profile.get("newest_tweet_id"),
+            "updated_at": profile.get("updated_at")
         }
 
         # The document to insert will have key = handle, value = row
@@ -78,6 +99,7 @@ class Database():
         # Step 2: Insert the new document
         result = self.mongo_collection.insert_one(document)
         print("Inserted document with ID:", result.inserted_id)
+        self.profile_cache.delete(handle)
 
         return result
 
@@ -85,6 +107,11 @@ class Database():
         # Query MongoDB using the handle to find the profile
         logger.info("Running select_profile")
         print("Running select_profile")
+        cached_profile = self.profile_cache.get(handle)
+        if cached_profile is not None:
+            logger.info(f"Profile cache hit for {handle} ({self.profile_cache.stats()})")
+            return cached_profile
+
         result = self.mongo_collection.find_one({"handle": handle})
         print("Result: ", result)
         logger.info(f"result {result}")
@@ -92,6 +119,7 @@ class Database():
             profile_data_without_id = {
                 key: value for key, value in result.items() if key != '_id'
             }
+            self.profile_cache.set(handle, profile_data_without_id)
             return profile_data_without_id
             # Extract the relevant data and return the specified structure
             # profile_data = result.get(handle)  # Since handle is used as the key
@@ -112,10 +140,87 @@ class Database():
             print(f"No profile found for handle: {handle}")
             return None
 
-      
+
+    def select_profiles(self, handles):
+        # Bulk lookup: cached profiles first, then one $in query for the rest
+        profiles = {}
+        misses = []
+        for handle in dict.fromkeys(handles):
+            cached_profile = self.profile_cache.get(handle)
+            if cached_profile is not None:
+                profiles[handle] = cached_profile
+            else:
+                misses.append(handle)
+
+        if misses:
+            logger.info(f"Running select_profiles for {len(misses)} handles")
+            for result in self.mongo_collection.find({"handle": {"$in": misses}}, {"_id": 0}):
+                # Keep the first match per handle, like find_one does
+                if result["handle"] not in profiles:
+                    profiles[result["handle"]] = result
+                    self.profile_cache.set(result["handle"], result)
+
+        logger.info(f"select_profiles: {len(profiles)} of {len(set(handles))} handles found")
+        return profiles
+
+    def update_profile(self, profile):
+        # Replace the stored profile of this handle with the refreshed one
+        document = {key: value for key, value in profile.items() if key != "_id"}
+        result = self.mongo_collection.replace_one({"handle": profile["handle"]}, document)
+        self.profile_cache.delete(profile["handle"])
+        logger.info(f"Updated profile for {profile['handle']}: {result.modified_count} modified")
+        return result
+
+    def select_saved_query(self, query_key):
+        # High-water mark and stored predictions of a saved topic query
+        result = self.saved_queries.find_one({"query_key": query_key}, {"_id": 0})
+        logger.info(f"Saved query found: {result is not None}")
+        return result
+
+    def upsert_saved_query(self, query_key, state):
+        document = dict(state, query_key=query_key)
+        return self.saved_queries.replace_one({"query_key": query_key}, document, upsert=True)
+
+    def select_credibility(self, handle, prediction_key=None):
+        # One document per handle; of the per-prediction history only the entry for prediction_key is read
+        projection = {"_id": 0, "seen": 0}
+        if prediction_key is not None:
+            projection = {field: 1 for field in CREDIBILITY_FIELDS}
+            projection.update({"_id": 0, f"seen.{prediction_key}": 1})
+        return self.credibility.find_one({"handle": handle}, projection)
+
+    def save_credibility(self, handle, changes, expected_version):
+        # Compare-and-set on "version" so concurrent updates of a handle don't overwrite each other.
+        # Returns False if another writer got there first; the caller re-reads and retries.
+        if not self._credibility_indexed:
+            self.credibility.create_index("handle", unique=True)
+            self._credibility_indexed = True
+
+        if expected_version is None:
+            document = {"handle": handle, "version": 1}
+            for field, value in changes.items():
+                # Dotted $set paths become nested fields
+                outer, _, inner = field.partition(".")
+                if inner:
+                    document.setdefault(outer, {})[inner] = value
+                else:
+                    document[field] = value
+            try:
+                self.credibility.insert_one(document)
+            except pymongo.errors.DuplicateKeyError:
+                return False
+            return True
+
+        result = self.credibility.update_one(
+            {"handle": handle, "version": expected_version},
+            {"$set": dict(changes, version=expected_version + 1)}
+        )
+        return result.matched_count == 1
 
     # def fetch_profiles(self):
     #     response = self.supabase.table("Predictor Profiles").select("*").execute()
     #     return response.data
 
 
+# Create a singleton instance
+db = Database()
@@ -0,0 +1,90 @@
+import os
+import re
+import zlib
+import logging
+from typing import List
+import numpy as np
+
+logger = logging.getLogger("app")
+
+# Estimated Jaccard similarity above which two tweets count as the same text
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.8"))
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 similarity become candidates
+SHINGLE_SIZE = 3
+_MERSENNE_PRIME = (1 << 31) - 1
+
+_rng = np.random.default_rng(42)
+_PERM_A = _rng.integers(1, _MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.int64)
+_PERM_B = _rng.integers(0, _MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.int64)
+
+
+def normalize_tweet(text: str) -> str:
+    """Strip retweet prefixes, links, mentions and punctuation that differ between copies."""
+    text = re.sub(r"^\s*RT\s+@\w+:?", " ", text or "")
+    text = re.sub(r"https?://\S+", " ", text)
+    text = re.sub(r"@\w+", " ", text)
+    return " ".join(re.findall(r"[a-z0-9$%#]+", text.lower()))
+
+
+def shingles(text: str) -> np.ndarray:
+    words = normalize_tweet(text).split()
+    if len(words) >= SHINGLE_SIZE:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    else:
+        grams = words
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) % _MERSENNE_PRIME for g in grams), dtype=np.int64))
+
+
+def minhash_signatures(texts: List[str]) -> np.ndarray:
+    """One row of NUM_PERMUTATIONS min-hashes per text; texts with no words get a unique row of -1s."""
+    signatures = np.full((len(texts), NUM_PERMUTATIONS), -1, dtype=np.int64)
+    for i, text in enumerate(texts):
+        hashes = shingles(text)
+        if hashes.size:
+            permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+            signatures[i] = permuted.min(axis=0)
+    return signatures
+
+
+def cluster_near_duplicates(texts: List[str], threshold: float = DEDUP_THRESHOLD) -> List[List[int]]:
+    """Group near-duplicate texts with MinHash + LSH.
+
+    Returns clusters of indices in first-seen order; the first index of each
+    cluster is its representative.
+    """
+    if not DEDUP_ENABLED or len(texts) < 2:
+        return [[i] for i in range(len(texts))]
+
+    signatures = minhash_signatures(texts)
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows_per_band = NUM_PERMUTATIONS // LSH_BANDS
+    for band in range(LSH_BANDS):
+        buckets = {}
+        band_rows = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        for i, row in enumerate(band_rows):
+            if row[0] < 0:
+                continue
+            buckets.setdefault(row.tobytes(), []).append(i)
+        for members in buckets.values():
+            for other in members[1:]:
+                a, b = find(members[0]), find(other)
+                if a != b and np.mean(signatures[members[0]] == signatures[other]) >= threshold:
+                    parent[max(a, b)] = min(a, b)
+
+    clusters = {}
+    for i in range(len(texts)):
+        clusters.setdefault(find(i), []).append(i)
+    result = sorted(clusters.values(), key=lambda cluster: cluster[0])
+    if len(result) < len(texts):
+        logger.info(f"Collapsed {len(texts)} tweets into {len(result)} near-duplicate clusters")
+    return result
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import threading
+import weakref
+import logging
+import httpx
+from openai import AsyncOpenAI
+
+logger = logging.getLogger("app")
+
+# Connection pool configuration (shared by every upstream call in the process)
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "120"))
+# LLM calls keep the OpenAI SDK's own default timeout, long gpt-4o analyses can exceed HTTP_TIMEOUT
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "600"))
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 without it."""
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.info("h2 is not installed, using HTTP/1.1 keep-alive only")
+        return False
+    return True
+
+
+class HttpClient:
+    """Process-wide pooled HTTP client layer for Datura, Google and OpenAI calls.
+
+    httpx.AsyncClient is bound to the event loop it is first used on, and the
+    agent tools start a fresh loop per call, so one async client is kept per
+    running loop. A loop's client holds a reference to the loop, so it must be
+    closed with `aclose` before the loop ends; `run` does that for
+    asyncio.run-style entry points. The sync client is shared by every thread.
+
+    LLM calls go through `openai_client`, an AsyncOpenAI on the loop's pooled
+    client, so they don't tie up default-executor threads.
+    """
+
+    def __init__(self):
+        self.limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+        self.timeout = httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        self.http2 = _http2_available()
+        self._async_clients = weakref.WeakKeyDictionary()
+        # loop -> {(base_url, api_key): (pooled client, AsyncOpenAI)}
+        self._openai_clients = weakref.WeakKeyDictionary()
+        self._sync_client = None
+        self._lock = threading.Lock()
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        """Return the pooled async client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+                self._async_clients[loop] = client
+                logger.info(f"Created pooled async HTTP client (http2={self.http2})")
+            return client
+
+    def openai_client(self, client) -> AsyncOpenAI:
+        """Return an AsyncOpenAI for the running loop, with the key and base URL of the sync `client`."""
+        async_client = self.get_async_client()
+        loop = asyncio.get_running_loop()
+        key = (str(client.base_url), client.api_key)
+        with self._lock:
+            clients = self._openai_clients.setdefault(loop, {})
+            pooled, openai_client = clients.get(key, (None, None))
+            if pooled is not async_client:
+                openai_client = AsyncOpenAI(api_key=client.api_key, base_url=client.base_url,
+                                            max_retries=client.max_retries, timeout=LLM_TIMEOUT,
+                                            http_client=async_client)
+                clients[key] = (async_client, openai_client)
+            return openai_client
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        """Return the pooled sync client, e.g. for the OpenAI SDK."""
+        with self._lock:
+            if self._sync_client is None or self._sync_client.is_closed:
+                self._sync_client = httpx.Client(limits=self.limits, timeout=self.timeout, http2=self.http2)
+            return self._sync_client
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return await self.get_async_client().request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        """Close the async client of the running loop (call before the loop ends)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.pop(loop, None)
+            self._openai_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def run(self, coro):
+        """asyncio.run(coro), closing the loop's async client before the loop ends."""
+        async def main():
+            try:
+                return await coro
+            finally:
+                await self.aclose()
+        return asyncio.run(main())
+
+
+# Create a singleton instance
+http_client = HttpClient()
@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import zlib
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger("app")
+
+# Where LLM labels are collected and trained models are stored
+CLASSIFIER_DIR = os.environ.get("CLASSIFIER_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".classifier"))
+# Probability a tweet must reach (or fall below 1 - this) to skip the LLM
+CLASSIFIER_CONFIDENCE = float(os.environ.get("CLASSIFIER_CONFIDENCE", "0.9"))
+# Don't trust a model trained on fewer examples than this
+CLASSIFIER_MIN_EXAMPLES = int(os.environ.get("CLASSIFIER_MIN_EXAMPLES", "500"))
+CLASSIFIER_ENABLED = os.environ.get("CLASSIFIER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+N_FEATURES = 2 ** 18
+
+
+def tokenize(text: str) -> List[str]:
+    text = re.sub(r"https?://\S+", " URL ", text.lower())
+    return re.findall(r"[a-z0-9$%@#']+", text)
+
+
+def featurize(texts: List[str], n_features: int = N_FEATURES) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Hash word unigrams and bigrams into a CSR matrix (indptr, indices, data), L2-normalised per row."""
+    indptr = [0]
+    indices = []
+    data = []
+    for text in texts:
+        tokens = tokenize(text)
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        counts = {}
+        for gram in grams:
+            index = zlib.crc32(gram.encode("utf-8")) % n_features
+            counts[index] = counts.get(index, 0.0) + 1.0
+        if counts:
+            values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            values /= np.linalg.norm(values)
+            indices.extend(counts.keys())
+            data.extend(values.tolist())
+        indptr.append(len(indices))
+    return (np.asarray(indptr, dtype=np.int64),
+            np.asarray(indices, dtype=np.int64),
+            np.asarray(data, dtype=np.float64))
+
+
+def _row_dot(weights: np.ndarray, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray) -> np.ndarray:
+    """Sparse matrix-vector product X @ weights for the CSR triple."""
+    products = weights[indices] * data
+    row_ids = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    return np.bincount(row_ids, weights=products, minlength=len(indptr) - 1)
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class LocalClassifier:
+    """Hashed n-gram logistic regression distilled from the LLM's Yes/No prediction labels.
+
+    Every label the LLM produces is appended to a JSONL file per classifier
+    name; `train` fits a model on it and `split` lets callers skip the LLM for
+    tweets the model is confident about.
+    """
+
+    def __init__(self, name: str, confidence: float = CLASSIFIER_CONFIDENCE):
+        self.name = name
+        self.confidence = confidence
+        self.data_path = os.path.join(CLASSIFIER_DIR, f"{name}_labels.jsonl")
+        self.model_path = os.path.join(CLASSIFIER_DIR, f"{name}_model.npz")
+        self.weights = None
+        self.bias = 0.0
+        self._model_mtime = None
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """(Re)load the model if the file changed, e.g. after a retrain. Returns whether a model is usable."""
+        try:
+            mtime = os.path.getmtime(self.model_path)
+        except OSError:
+            return False
+        if mtime != self._model_mtime:
+            with np.load(self.model_path) as model:
+                if int(model["n_examples"]) < CLASSIFIER_MIN_EXAMPLES:
+                    logger.info(f"Local classifier {self.name} has too few training examples, not using it")
+                    self.weights = None
+                else:
+                    self.weights = model["weights"]
+                    self.bias = float(model["bias"])
+            self._model_mtime = mtime
+        return self.weights is not None
+
+    def predict_proba(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Probability that each tweet is a prediction, or None if no model is available."""
+        if not CLASSIFIER_ENABLED or not texts or not self.load():
+            return None
+        indptr, indices, data = featurize(texts)
+        return _sigmoid(_row_dot(self.weights, indptr, indices, data) + self.bias)
+
+    def split(self, texts: List[str]) -> Tuple[Dict[int, str], List[int]]:
+        """Label confident tweets locally; return ({index: "Yes"/"No"}, indices still needing the LLM)."""
+        probabilities = self.predict_proba(texts)
+        if probabilities is None:
+            return {}, list(range(len(texts)))
+
+        labels = {}
+        uncertain = []
+        for i, p in enumerate(probabilities):
+            if p >= self.confidence:
+                labels[i] = "Yes"
+            elif p <= 1 - self.confidence:
+                labels[i] = "No"
+            else:
+                uncertain.append(i)
+        logger.info(f"Local classifier {self.name}: {len(labels)} labelled locally, {len(uncertain)} sent to the LLM")
+        return labels, uncertain
+
+    def record(self, texts: List[str], labels: List[str]):
+        """Append LLM-produced labels to the training data."""
+        rows = [
+            json.dumps({"text": text, "label": 1 if label == "Yes" else 0})
+            for text, label in zip(texts, labels)
+            if label in ("Yes", "No") and text
+        ]
+        if not rows:
+            return
+        try:
+            os.makedirs(CLASSIFIER_DIR, exist_ok=True)
+            with self._lock, open(self.data_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(rows) + "\n")
+        except OSError as e:
+            logger.error(f"Could not record labels for local classifier {self.name}: {e}")
+
+    def load_training_data(self) -> Tuple[List[str], np.ndarray]:
+        # Later labels for the same text win
+        examples = {}
+        with open(self.data_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                examples[row["text"]] = row["label"]
+        return list(examples.keys()), np.asarray(list(examples.values()), dtype=np.float64)
+
+    def train(self, epochs: int = 200, learning_rate: float = 2.0, l2: float = 1e-4) -> Dict:
+        """Fit the model with full-batch gradient descent on all recorded labels and save it."""
+        texts, labels = self.load_training_data()
+        if len(texts) == 0 or labels.min() == labels.max():
+            raise ValueError(f"Need both Yes and No labels to train {self.name}, found {len(texts)} examples")
+
+        indptr, indices, data = featurize(texts)
+        row_ids = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        # Shuffle once and hold out 10% to report accuracy
+        order = np.random.default_rng(0).permutation(len(texts))
+        holdout = np.zeros(len(texts), dtype=bool)
+        holdout[order[: len(texts) // 10]] = True
+        train_mask = ~holdout
+        n_train = int(train_mask.sum())
+
+        weights = np.zeros(N_FEATURES)
+        bias = 0.0
+        for _ in range(epochs):
+            residual = (_sigmoid(_row_dot(weights, indptr, indices, data) + bias) - labels) * train_mask
+            gradient = np.bincount(indices, weights=data * residual[row_ids], minlength=N_FEATURES) / n_train
+            weights -= learning_rate * (gradient + l2 * weights)
+            bias -= learning_rate * residual.sum() / n_train
+
+        probabilities = _sigmoid(_row_dot(weights, indptr, indices, data) + bias)
+        predictions = probabilities >= 0.5
+        confident = (probabilities >= self.confidence) | (probabilities <= 1 - self.confidence)
+        metrics = {
+            "name": self.name,
+            "n_examples": len(texts),
+            "train_accuracy": float((predictions == labels)[train_mask].mean()),
+            "holdout_accuracy": float((predictions == labels)[holdout].mean()) if holdout.any() else None,
+            "holdout_confident_share": float(confident[holdout].mean()) if holdout.any() else None,
+            "holdout_confident_accuracy": float((predictions == labels)[holdout & confident].mean()) if (holdout & confident).any() else None,
+        }
+
+        os.makedirs(CLASSIFIER_DIR, exist_ok=True)
+        tmp_path = self.model_path + ".tmp.npz"
+        np.savez_compressed(tmp_path, weights=weights, bias=bias, n_examples=len(texts), trained_at=time.time())
+        os.replace(tmp_path, self.model_path)
+        logger.info(f"Trained local classifier: {metrics}")
+        return metrics
+
+
+# One classifier per LLM prompt, since the Finder and Profiler label slightly differently
+finder_classifier = LocalClassifier("finder")
+profiler_classifier = LocalClassifier("profiler")
+
+
+if __name__ == "__main__":
+    # python -m backend.LocalClassifier retrain [--name finder|profiler] [--epochs 200]
+    parser = argparse.ArgumentParser(description="Local prediction classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    retrain_parser = subparsers.add_parser("retrain", help="Retrain from the recorded LLM labels")
+    retrain_parser.add_argument("--name", choices=["finder", "profiler"], help="Only retrain this classifier")
+    retrain_parser.add_argument("--epochs", type=int, default=200)
+    args = parser.parse_args()
+
+    for classifier in (finder_classifier, profiler_classifier):
+        if args.name and classifier.name != args.name:
+            continue
+        try:
+            print(json.dumps(classifier.train(epochs=args.epochs), indent=4))
+        except (OSError, ValueError) as e:
+            print(f"Skipping {classifier.name}: {e}")
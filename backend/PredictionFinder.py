@@ -1,12 +1,20 @@
 import json
-from typing import List, Dict, Tuple
+from typing import AsyncIterator, List, Dict, Tuple
 from utils.progress_bar import progress_manager
-import requests
+from .HttpClient import http_client
+from .Cache import TTLCache, LabelCache, make_key, normalize_text
+from .LocalClassifier import finder_classifier
+from .Dedup import cluster_near_duplicates
+from .Database import db
+from .RetryPolicy import retry_policy, CircuitOpenError
+from dateutil import parser as date_parser
+import httpx
+import tiktoken
 import re
 import os
+import time
 import asyncio
 from dotenv import load_dotenv
-import requests
 import logging
 dotenv_path = "C:\Amit_Laptop_backup\Imperial_essentials\AI Society\Hackathon Torus\.env"
 loaded = load_dotenv(dotenv_path=dotenv_path)
@@ -18,6 +26,75 @@ logger = logging.getLogger("app")
 
 # Initialize environment variables
 MODEL_NAME = os.environ.get("MODEL_NAME", "gpt-4o-2024-08-06")
+TWEET_SEARCH_CACHE_TTL = float(os.environ.get("TWEET_SEARCH_CACHE_TTL", "900"))
+TWEET_SEARCH_CACHE_SIZE = int(os.environ.get("TWEET_SEARCH_CACHE_SIZE", "256"))
+
+# Datura topic search results, shared by every PredictionFinder in the process
+tweet_search_cache = TTLCache("tweet_search", maxsize=TWEET_SEARCH_CACHE_SIZE, ttl=TWEET_SEARCH_CACHE_TTL, persist=True)
+
+# Oldest tweets a topic search looks at; saved queries move this forward
+DEFAULT_START_DATE = "2024-04-10"
+SAVED_QUERY_MAX_PREDICTIONS = int(os.environ.get("SAVED_QUERY_MAX_PREDICTIONS", "500"))
+
+# Classification batching: prompt token budget per batch, tweets per batch and concurrent batches
+FINDER_BATCH_TOKEN_BUDGET = int(os.environ.get("FINDER_BATCH_TOKEN_BUDGET", "1500"))
+FINDER_BATCH_MAX_TWEETS = int(os.environ.get("FINDER_BATCH_MAX_TWEETS", "25"))
+FINDER_MAX_CONCURRENCY = int(os.environ.get("FINDER_MAX_CONCURRENCY", "4"))
+
+_token_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens, estimating ~4 characters per token if tiktoken can't load its encoding."""
+    global _token_encoding
+    if _token_encoding is None:
+        try:
+            try:
+                _token_encoding = tiktoken.encoding_for_model(MODEL_NAME)
+            except KeyError:
+                _token_encoding = tiktoken.get_encoding("cl100k_base")  # fallback
+        except Exception as e:
+            # Also covers the encoding download failing; don't retry it on every call
+            logger.info(f"tiktoken encoding unavailable, estimating token counts: {e}")
+            _token_encoding = False
+    if _token_encoding is False:
+        return len(text) // 4 + 1
+    return len(_token_encoding.encode(text))
+
+
+PREDICTION_CLASSIFIER_PROMPT = """You are an expert in identifying explicit and implicit predictions in tweets related to Polymarket topics.
+
+Here is a JSON object containing tweets, where each key represents a unique tweet ID and the value is the tweet text.
+
+Your task:  
+For each tweet, determine if it contains an **explicit or implicit prediction** about a future event **related to a Polymarket topic**.  
+- If it **does**, return "Yes".  
+- If it **does not**, return "No".  
+
+Format your response as a JSON object with each tweet ID mapped to "Yes" or "No".
+
+Example:
+
+Input JSON:
+{
+    "1812345678901234561": "Bitcoin will hit $100K by the end of 2025!",
+    "1812345678901234562": "The economy is in trouble. People are struggling.",
+    "1812345678901234563": "I bet Trump wins the next election."
+}
+
+Expected Output:
+{
+    "1812345678901234561": "Yes",
+    "1812345678901234562": "No",
+    "1812345678901234563": "Yes"
+}
+
+Now, analyze the following tweets and generate the output: 
+Ensure the response is **valid JSON** with no additional text.
+"""
+
+# Cached LLM labels are tied to this prompt and model
+finder_label_cache = LabelCache(make_key(PREDICTION_CLASSIFIER_PROMPT, MODEL_NAME))
 
 class PredictionFinder:
     """Finds tweets containing predictions about specified topics."""
@@ -80,13 +157,13 @@ Now, given the following user prompt, generate a properly formatted Datura API q
         
         return completion.choices[0].message.content.strip()
 
-    async def get_tweets(self, user_prompt: str, min_likes: int = 0, count: int = 100, max_retries = 5) -> List[Dict]:
+    async def get_tweets(self, user_prompt: str, min_likes: int = 0, count: int = 100, max_retries = 5, use_cache: bool = True, start_date: str = DEFAULT_START_DATE) -> List[Dict]:
         #Fetch tweets from Datura API based on the user prompt.
         
         payload = {
             "prompt": user_prompt,
             "model": "HORIZON",
-            "start_date": "2024-04-10",
+            "start_date": start_date,
             "lang": "en",
             "verified": False,
             "blue_verified": False,
@@ -98,6 +175,15 @@ Now, given the following user prompt, generate a properly formatted Datura API q
             "min_likes": min_likes,
             "count": count
         }
+
+        # Same market asked about again within the TTL -> reuse the Datura result
+        search_params = {key: value for key, value in payload.items() if key != "prompt"}
+        cache_key = make_key(normalize_text(user_prompt), search_params)
+        if use_cache:
+            cached_tweets = tweet_search_cache.get(cache_key)
+            if cached_tweets is not None:
+                logger.info(f"Tweet search cache hit: {len(cached_tweets)} tweets")
+                return cached_tweets
         
         headers = {
             "Authorization": self.datura_api_key,
@@ -105,47 +191,45 @@ Now, given the following user prompt, generate a properly formatted Datura API q
         }
         logger.info(f"api_key: {self.datura_api_key}")
         print("datura api key", self.datura_api_key)
-        for attempt in range(max_retries):
-            try:
-                print(f"🔁 Attempt {attempt + 1} to fetch tweets...")
-                logger.info(f"🔁 Attempt {attempt + 1} to fetch tweets...")
-                response = await asyncio.to_thread(requests.post, url=self.datura_api_url, json=payload, headers=headers)
-
-                logger.info(f"response: {response}")
-                response.raise_for_status()
-                data = response.json()
-                tweets_ls = data.get("miner_tweets", [])
-                #print(tweets_ls)
-                print(len(tweets_ls), "tweets found")
-                logger.info(f"tweets found: {len(tweets_ls)}")
-                if len(tweets_ls) > 0:
-                    return tweets_ls
-                
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Attempt {attempt + 1} failed: {e}")
-                logger.info(f"❌ Attempt {attempt + 1} failed: {e}")
-                if attempt == max_retries-1:
-                    print("🚫 Max retries reached. Returning error.")
-                    logger.info("🚫 Max retries reached. Returning error.")
-                    return []
-            
-            print(f"Attempt {attempt + 1} failed. Retrying...")
-            logger.info(f"Attempt {attempt + 1} failed. Retrying...")
-            await asyncio.sleep(2)
-        
-        print("🚫 Max retries reached. Returning error.")
-        logger.info("🚫 Max retries reached. Returning error.")
-        return {"error": "Invalid Username. No tweets found after 5 attempts.", "tweets": []}
+
+        async def fetch_tweets():
+            response = await http_client.post(self.datura_api_url, json=payload, headers=headers)
+            logger.info(f"response: {response}")
+            response.raise_for_status()
+            tweets_ls = response.json().get("miner_tweets", [])
+            print(len(tweets_ls), "tweets found")
+            logger.info(f"tweets found: {len(tweets_ls)}")
+            return tweets_ls
+
+        try:
+            # An empty result is retried as well, Datura sometimes answers before its miners do
+            tweets_ls = await retry_policy.run("datura_search", fetch_tweets,
+                                               retry_if_result=lambda tweets: not tweets, max_attempts=max_retries)
+        except CircuitOpenError as e:
+            logger.info(f"🚫 {e}. Returning error.")
+            return []
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"❌ Fetching tweets failed: {e}")
+            logger.info(f"🚫 Max retries reached. Returning error: {e}")
+            return []
+
+        if not tweets_ls:
+            print("🚫 Max retries reached. No tweets found.")
+            logger.info("🚫 Max retries reached. No tweets found.")
+            return []
+
+        tweet_search_cache.set(cache_key, tweets_ls)
+        return tweets_ls
 
     def process_tweets(self, tweets: List[Dict]) -> Tuple[Dict, Dict]:
-        """Process tweets to create structured data."""
+        """Process tweets to create structured data, keyed by tweet ID."""
         hash_dict = {}
-        username_to_tweet = {}
+        id_to_tweet = {}
         
         for tweet in tweets:
-            user_id = tweet["user"]["id"]
+            tweet_id = str(tweet["id"])
             
-            hash_dict[user_id] = {
+            hash_dict[tweet_id] = {
                 "username": tweet["user"]["username"],
                 "favourites_count": tweet["user"]["favourites_count"],
                 "is_blue_verified": tweet["user"]["is_blue_verified"],
@@ -155,72 +239,132 @@ Now, given the following user prompt, generate a properly formatted Datura API q
                 "tweet url": tweet["url"],
             }
             
-            username_to_tweet[tweet["user"]["username"]] = tweet["text"]
+            id_to_tweet[tweet_id] = tweet["text"]
         
-        return hash_dict, username_to_tweet
-    
-    def analyze_predictions(self, username_to_tweet: Dict) -> str:
-        """Analyze tweets to identify predictions."""
-        json_string = json.dumps(username_to_tweet, indent=4)
-        
-        context = """You are an expert in identifying explicit and implicit predictions in tweets related to Polymarket topics.
-
-Here is a JSON object containing tweets, where each key represents a unique tweet ID and the value is the tweet text.
-
-Your task:  
-For each tweet, determine if it contains an **explicit or implicit prediction** about a future event **related to a Polymarket topic**.  
-- If it **does**, return "Yes".  
-- If it **does not**, return "No".  
+        return hash_dict, id_to_tweet
 
-Format your response as a JSON object with each tweet ID mapped to "Yes" or "No".
+    def batch_tweets(self, id_to_tweet: Dict, token_budget: int = FINDER_BATCH_TOKEN_BUDGET) -> List[Dict]:
+        """Split tweets into batches whose prompt size stays within the token budget."""
+        batches = []
+        current_batch = {}
+        current_tokens = 0
 
-Example:
+        for tweet_id, text in id_to_tweet.items():
+            # Each entry costs its ID, its text and the JSON punctuation around them
+            tweet_tokens = count_tokens(tweet_id) + count_tokens(text) + 8
+            if current_batch and (current_tokens + tweet_tokens > token_budget or len(current_batch) >= FINDER_BATCH_MAX_TWEETS):
+                batches.append(current_batch)
+                current_batch = {}
+                current_tokens = 0
+            current_batch[tweet_id] = text
+            current_tokens += tweet_tokens
 
-Input JSON:
-{
-    "username1": "Bitcoin will hit $100K by the end of 2025!",
-    "username2": "The economy is in trouble. People are struggling.",
-    "username3": "I bet Trump wins the next election."
-}
+        if current_batch:
+            batches.append(current_batch)
+        return batches
 
-Expected Output:
-{
-    "username1": "Yes",
-    "username2": "No",
-    "username3": "Yes"
-}
+    async def classify_batch(self, batch: Dict) -> Dict:
+        """Label one batch of tweets; a malformed response only costs this batch."""
+        json_string = json.dumps(batch, indent=4)
 
-Now, analyze the following tweets and generate the output: 
-Ensure the response is **valid JSON** with no additional text.
-"""
-        
-        completion = self.groq_client.chat.completions.create(
+        response = await http_client.openai_client(self.groq_client).chat.completions.create(
             model=MODEL_NAME,
             messages=[
-                {"role": "system", "content": context},
+                {"role": "system", "content": PREDICTION_CLASSIFIER_PROMPT},
                 {"role": "user", "content": json_string}
             ]
         )
-        
-        return completion.choices[0].message.content
+
+        raw_output = response.choices[0].message.content
+        raw_output = re.sub(r"^```(json)?|```$", "", raw_output.strip()).strip()
+        match = re.search(r"\{.*\}", raw_output, re.DOTALL)
+        if match:
+            raw_output = match.group(0)
+
+        try:
+            parsed = json.loads(raw_output.encode().decode('utf-8-sig'))
+        except json.JSONDecodeError:
+            logger.info(f"Failed to parse LLM response for a batch of {len(batch)} tweets")
+            parsed = {}
+
+        if not isinstance(parsed, dict):
+            parsed = {}
+        labels = {tweet_id: "Yes" if parsed.get(tweet_id) == "Yes" else "No" for tweet_id in batch}
+
+        # Labels the LLM actually returned become training data for the local classifier
+        answered = [tweet_id for tweet_id in batch if parsed.get(tweet_id) in ("Yes", "No")]
+        answered_texts = [batch[tweet_id] for tweet_id in answered]
+        answered_labels = [labels[tweet_id] for tweet_id in answered]
+        finder_classifier.record(answered_texts, answered_labels)
+        finder_label_cache.save(answered_texts, answered_labels)
+        return labels
+
+    def start_classification(self, id_to_tweet: Dict) -> List[asyncio.Task]:
+        """Schedule one classification task per batch, at most FINDER_MAX_CONCURRENCY running at once.
+
+        Near-duplicate tweets are collapsed to one representative whose label
+        is fanned back out to the whole cluster. Representatives found in the
+        label cache or that the local classifier is confident about are
+        labelled up front and only the rest are batched for the LLM.
+        """
+        all_ids = list(id_to_tweet.keys())
+        clusters = cluster_near_duplicates([id_to_tweet[tweet_id] for tweet_id in all_ids])
+        cluster_members = {all_ids[cluster[0]]: [all_ids[i] for i in cluster] for cluster in clusters}
+
+        def fan_out(yes_no_dict):
+            return {member: label for tweet_id, label in yes_no_dict.items() for member in cluster_members[tweet_id]}
+
+        # Previously classified texts come from the label cache, then the local classifier takes its share
+        tweet_ids = list(cluster_members.keys())
+        cached_labels = finder_label_cache.lookup([id_to_tweet[tweet_id] for tweet_id in tweet_ids])
+        local_yes_no = {tweet_ids[i]: label for i, label in cached_labels.items()}
+        tweet_ids = [tweet_id for i, tweet_id in enumerate(tweet_ids) if i not in cached_labels]
+        local_labels, uncertain = finder_classifier.split([id_to_tweet[tweet_id] for tweet_id in tweet_ids])
+        local_yes_no.update({tweet_ids[i]: label for i, label in local_labels.items()})
+
+        batches = self.batch_tweets({tweet_ids[i]: id_to_tweet[tweet_ids[i]] for i in uncertain})
+        semaphore = asyncio.Semaphore(FINDER_MAX_CONCURRENCY)
+        logger.info(f"Classifying {len(uncertain)} of {len(id_to_tweet)} tweets in {len(batches)} batches")
+
+        async def classify_locally():
+            return fan_out(local_yes_no)
+
+        async def classify_with_limit(batch):
+            async with semaphore:
+                return fan_out(await self.classify_batch(batch))
+
+        tasks = [asyncio.create_task(classify_with_limit(batch)) for batch in batches]
+        if local_yes_no:
+            tasks.insert(0, asyncio.create_task(classify_locally()))
+        return tasks
+
+    async def analyze_predictions(self, id_to_tweet: Dict) -> Dict:
+        """Analyze tweets to identify predictions, classifying batches concurrently."""
+        batch_results = await asyncio.gather(*self.start_classification(id_to_tweet))
+
+        yes_no_dict = {}
+        for batch_result in batch_results:
+            yes_no_dict.update(batch_result)
+        return yes_no_dict
     
-    def filter_tweets_by_prediction(self, yes_no: str, hash_dict: Dict) -> str:
+    def filter_tweets_by_prediction(self, yes_no_dict: Dict, hash_dict: Dict) -> str:
         """Filter tweets to only include those with predictions."""
-        match_yes_no = re.search(r"\{(.*)\}", yes_no, re.DOTALL)
-        json_content_yes_no = "{" + match_yes_no.group(1) + "}"
-        
-        yes_no_dict = json.loads(json_content_yes_no)
-        
         filtered_tweets = {
             tweet_id: details
             for tweet_id, details in hash_dict.items()
-            if details["username"] in yes_no_dict and yes_no_dict[details["username"]] == "Yes"
+            if yes_no_dict.get(tweet_id) == "Yes"
         }
         
         return json.dumps(filtered_tweets, indent=4)
     
-    async def find_predictions(self, user_prompt: str) -> Dict:
-        """Main method to find predictions based on user prompt."""
+    async def find_predictions(self, user_prompt: str, saved_query: bool = False) -> Dict:
+        """Main method to find predictions based on user prompt.
+
+        With saved_query=True only tweets newer than the last sweep of this
+        prompt are fetched and classified (see sweep_predictions).
+        """
+        if saved_query:
+            return await self.sweep_predictions(user_prompt)
 
         print(f"Generated Search Query: {user_prompt}")
         logger.info(f"Value of : {progress_manager.get_callback()}")
@@ -238,14 +382,14 @@ Ensure the response is **valid JSON** with no additional text.
             return {"error": "No tweets found matching the criteria"}
 
         # Process tweets
-        hash_dict, username_to_tweet = self.process_tweets(tweets)
+        hash_dict, id_to_tweet = self.process_tweets(tweets)
 
         # if progress_manager.get_callback():
         #     print(f"Inside 2: {progress_manager.get_callback()}")
         #     progress_manager.update_progress(60, "🧮 Processing tweets...")
 
         # Analyze predictions
-        prediction_analysis = self.analyze_predictions(username_to_tweet)
+        prediction_analysis = await self.analyze_predictions(id_to_tweet)
 
         # Filter tweets
         filtered_predictions = self.filter_tweets_by_prediction(prediction_analysis, hash_dict)
@@ -257,4 +401,72 @@ Ensure the response is **valid JSON** with no additional text.
         #     progress_manager.update_progress(80, "💭 Formulating response...")
 
         # Return as dictionary
-        return json.loads(filtered_predictions)
\ No newline at end of file
+        return json.loads(filtered_predictions)
+
+    async def sweep_predictions(self, user_prompt: str) -> Dict:
+        """Incremental find_predictions for a saved query.
+
+        Stores a per-query high-water mark (newest tweet ID and timestamp).
+        Later sweeps search from that day on, classify only tweets above the
+        mark and merge them into the stored predictions.
+        """
+        query_key = make_key(normalize_text(user_prompt))
+        state = await asyncio.to_thread(db.select_saved_query, query_key) or {}
+        since_id = int(state.get("since_id", 0))
+        start_date = DEFAULT_START_DATE
+        if state.get("latest_created_at"):
+            try:
+                start_date = date_parser.parse(state["latest_created_at"]).strftime("%Y-%m-%d")
+            except (ValueError, OverflowError):
+                logger.info(f"Could not parse saved query timestamp {state['latest_created_at']}")
+
+        tweets = await self.get_tweets(user_prompt, use_cache=False, start_date=start_date)
+        if not isinstance(tweets, list):
+            tweets = []
+        new_tweets = [tweet for tweet in tweets if int(tweet["id"]) > since_id]
+        logger.info(f"Saved query sweep: {len(new_tweets)} new of {len(tweets)} tweets since {since_id}")
+
+        predictions = state.get("predictions", {})
+        if new_tweets:
+            hash_dict, id_to_tweet = self.process_tweets(new_tweets)
+            yes_no_dict = await self.analyze_predictions(id_to_tweet)
+            predictions.update(json.loads(self.filter_tweets_by_prediction(yes_no_dict, hash_dict)))
+
+            # Keep the newest predictions only
+            newest_ids = sorted(predictions, key=int, reverse=True)[:SAVED_QUERY_MAX_PREDICTIONS]
+            predictions = {tweet_id: predictions[tweet_id] for tweet_id in newest_ids}
+
+            newest_tweet = max(new_tweets, key=lambda tweet: int(tweet["id"]))
+            state.update({
+                "prompt": user_prompt,
+                "since_id": str(newest_tweet["id"]),
+                "latest_created_at": newest_tweet["created_at"],
+                "predictions": predictions,
+                "updated_at": time.time(),
+            })
+            await asyncio.to_thread(db.upsert_saved_query, query_key, state)
+
+        if not predictions and not tweets:
+            return {"error": "No tweets found matching the criteria"}
+        return predictions
+
+    async def stream_predictions(self, user_prompt: str) -> AsyncIterator[Tuple[str, Dict]]:
+        """Yield (tweet_id, details) for each prediction tweet as soon as its batch is classified."""
+        logger.info(f"Streaming predictions for: {user_prompt}")
+        tweets = await self.get_tweets(user_prompt)
+        if not tweets or not isinstance(tweets, list):
+            logger.info("No tweets found matching the criteria")
+            return
+
+        hash_dict, id_to_tweet = self.process_tweets(tweets)
+        tasks = self.start_classification(id_to_tweet)
+        try:
+            for next_batch in asyncio.as_completed(tasks):
+                yes_no_dict = await next_batch
+                for tweet_id, label in yes_no_dict.items():
+                    if label == "Yes":
+                        yield tweet_id, hash_dict[tweet_id]
+        finally:
+            # The consumer may stop early; don't leave batches running in the background
+            for task in tasks:
+                task.cancel()
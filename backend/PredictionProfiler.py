@@ -1,11 +1,22 @@
-from typing import List, Dict
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 import asyncio 
-import requests
+import httpx
 from .PredictionVerifier import PredictionVerifier
+from .HttpClient import http_client
+from .LocalClassifier import profiler_classifier
+from .Dedup import cluster_near_duplicates
+from .RetryPolicy import retry_policy, CircuitOpenError
+from .Cache import TTLCache, LabelCache, make_key, normalize_text
+from .SingleFlight import SingleFlight
+from .Scheduler import verification_scheduler
+from .TopicAnalytics import topic_distribution
 import re
 import json
 import os 
-from .Database import Database
+import random
+import time
+import numpy as np
+from .Database import db
 from dotenv import load_dotenv
 import logging
 dotenv_path = "C:\Amit_Laptop_backup\Imperial_essentials\AI Society\Hackathon Torus\.env"
@@ -22,9 +33,293 @@ logging.basicConfig(level=logging.INFO)
 # Initialize environment variables
 MODEL_NAME = os.environ.get("MODEL_NAME", "gpt-4o-2024-08-06")
 MODEL_NAME1 = os.environ.get("MODEL_NAME1", "gpt-4o-mini-2024-07-18")
+# Stored profiles older than this (seconds) are refreshed with newer tweets on access
+PROFILE_REFRESH_AFTER = float(os.environ.get("PROFILE_REFRESH_AFTER", str(24 * 3600)))
+# How long non-predictor handles and failed lookups are remembered (seconds)
+NEGATIVE_PROFILE_TTL = float(os.environ.get("NEGATIVE_PROFILE_TTL", str(6 * 3600)))
+NEGATIVE_ERROR_TTL = float(os.environ.get("NEGATIVE_ERROR_TTL", "300"))
+NEGATIVE_CACHE_SIZE = int(os.environ.get("NEGATIVE_CACHE_SIZE", "4096"))
+# Predictions per analyze_prediction_patterns chunk, and how long chunk analyses are cached (seconds)
+PATTERN_CHUNK_SIZE = int(os.environ.get("PATTERN_CHUNK_SIZE", "40"))
+PATTERN_CHUNK_CACHE_TTL = float(os.environ.get("PATTERN_CHUNK_CACHE_TTL", str(30 * 24 * 3600)))
+# Sampled credibility estimates stop once the credible interval is this narrow, or after this many verifications
+CREDIBILITY_CI_WIDTH = float(os.environ.get("CREDIBILITY_CI_WIDTH", "0.3"))
+CREDIBILITY_SAMPLE_BUDGET = int(os.environ.get("CREDIBILITY_SAMPLE_BUDGET", "30"))
+CREDIBILITY_MIN_SAMPLES = int(os.environ.get("CREDIBILITY_MIN_SAMPLES", "5"))
+CREDIBILITY_CONFIDENCE = float(os.environ.get("CREDIBILITY_CONFIDENCE", "0.9"))
+# Verifications a sampled estimate keeps in flight; more means faster but more wasted calls when it stops early
+CREDIBILITY_SAMPLE_CONCURRENCY = int(os.environ.get("CREDIBILITY_SAMPLE_CONCURRENCY", "4"))
+# Half-life (seconds) of a verification's weight in the persisted, time-decayed credibility score
+CREDIBILITY_HALF_LIFE = float(os.environ.get("CREDIBILITY_HALF_LIFE", str(90 * 24 * 3600)))
+# Pages of 50 tweets a refresh fetches at most to reach the previous newest tweet
+PROFILE_REFRESH_MAX_PAGES = int(os.environ.get("PROFILE_REFRESH_MAX_PAGES", "10"))
+# Prediction-filter batches sent to the LLM at the same time
+PROFILER_MAX_CONCURRENCY = int(os.environ.get("PROFILER_MAX_CONCURRENCY", "4"))
+
+
+# get_profile's default `stored`: the handle hasn't been looked up in the db yet
+NOT_LOOKED_UP = object()
+
+# Concurrent get_profile calls for the same handle await a single build
+profile_flights = SingleFlight("get_profile")
+
+# Handles that were analyzed but not stored (prediction_rate <= 0.3) or that failed
+negative_profiles = TTLCache("negative_profiles", maxsize=NEGATIVE_CACHE_SIZE, ttl=NEGATIVE_PROFILE_TTL, persist=True)
+
+PREDICTION_FILTER_PROMPT = """You are an expert in identifying **explicit and implicit predictions** in tweets that could be relevant to **Polymarket**, a prediction market platform. Polymarket users bet on **future events** in politics, policy, business, law, and geopolitics.
+
+            **Definitions:**
+            1. **Explicit Prediction**: A direct statement about a future outcome (e.g., "X will happen," "Y is likely to pass").
+            2. **Implicit Prediction**: A statement implying a future outcome (e.g., "Senator proposes bill," "Protests may lead to...").
+
+            **Polymarket Topics Include:**
+            - Elections, legislation, court rulings
+            - Policy changes (tariffs, regulations)
+            - Business decisions (company moves, market impacts)
+            - Geopolitical events (wars, treaties, sanctions)
+            - Legal/Investigative outcomes (prosecutions, declassifications)
+
+            **Important Instruction:** Be *generous* in your classification. If a tweet suggests even a plausible implication of a future event **relevant to Polymarket topics**, classify it as **"Yes"**. It is better to include weak signals than to exclude potentially relevant ones. When in doubt, lean toward **"Yes"**.
+
+            **Exclude:**
+            - Past events (unless they imply future consequences)
+            - Pure opinions without any forecastable outcome
+            - Non-actionable statements (e.g., "People are struggling")
+
+            **Examples:**
+            - "Trump will win in 2024" → **Yes (Explicit)**
+            - "Senator proposes bill to ban TikTok" → **Yes (Implicit)**
+            - "Nikki Haley is gaining ground in Iowa polls." → **Yes (Implicit)** (implies prediction market relevance)
+            - "Senate to vote on crypto regulation bill next week." → **Yes (Implicit)**
+            - "Will Russia use nuclear weapons in 2024?" → **Yes (Explicit)**
+            - "Israel expected to launch ground invasion of Gaza." → **Yes (Implicit)**
+            - "Elon Musk hints at stepping down as Twitter CEO." → **Yes (Implicit)**
+            - "The economy is collapsing" → **No** (No actionable prediction)
+            - "I miss when politicians actually cared about the people." → **No** (opinion, not predictive)
+            - "The economy crashed last year and it's all downhill from here." → **No** (past event, vague future implication)
+            - "Climate change is real." → **No** (statement, no actionable prediction)
+
+            **Task:** For each tweet, return **"Yes"** if it contains an explicit or implicit prediction relevant to Polymarket — even if it's subtle or implied. Respond *only* with a JSON object like:
+            {
+            "predictions": ["Yes", "No", ...]
+            }
+            """
+
+# Cached LLM labels are tied to this prompt and model
+profiler_label_cache = LabelCache(make_key(PREDICTION_FILTER_PROMPT, MODEL_NAME1))
+
+def normalize_handle(handle: str) -> str:
+    return handle.strip().lstrip("@").lower()
+
+
+def dedupe_handles(handles: List[str]) -> Dict[str, str]:
+    """Map each normalized handle to the first spelling it was requested with."""
+    unique_handles = {}
+    for handle in handles:
+        unique_handles.setdefault(normalize_handle(handle), handle)
+    return unique_handles
+
+
+def needs_refresh(profile: Dict, refresh: bool = False) -> bool:
+    """Stored profiles built with a newest_tweet_id can be refreshed when forced or stale."""
+    is_stale = time.time() - profile.get("updated_at", 0) > PROFILE_REFRESH_AFTER
+    return bool((refresh or is_stale) and profile.get("newest_tweet_id"))
+
+
+def negative_record(profile: Dict) -> Dict:
+    """Negative-cache record of a non-predictor profile: the full profile plus when it was analyzed."""
+    return {**profile, "analyzed_at": time.time()}
+
+
+def profile_from_negative(record: Dict) -> Dict:
+    """The profile a negative-cache hit answers with, identical to the one first built."""
+    if "error" in record:
+        return {"error": record["error"]}
+    return {key: value for key, value in record.items() if key != "analyzed_at"}
+
+
+def parse_json_object(raw_output: str) -> Optional[Dict]:
+    """Extract the JSON object from an LLM response; None if it is missing or malformed."""
+    raw_output = re.sub(r"^```(json)?|```$", "", raw_output.strip()).strip()
+    match = re.search(r"\{.*\}", raw_output, re.DOTALL)
+    if not match:
+        return None
+    try:
+        parsed = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def chunk_predictions(predictions: List[str], chunk_size: int) -> List[List[str]]:
+    """Split newest-first predictions into chunks aligned to the oldest end.
+
+    New predictions are prepended on refresh, so only the newest chunk
+    changes and every older chunk keeps its cache key.
+    """
+    chunks = []
+    for end in range(len(predictions), 0, -chunk_size):
+        chunks.append(predictions[max(0, end - chunk_size):end])
+    return chunks[::-1]
+
+
+def beta_credible_interval(successes: int, failures: int, confidence: float = CREDIBILITY_CONFIDENCE,
+                           samples: int = 20000) -> Tuple[float, float]:
+    """Equal-tailed credible interval for a success rate under a Beta(1, 1) prior, from posterior samples."""
+    draws = np.random.default_rng().beta(successes + 1, failures + 1, size=samples)
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(draws, [tail, 1 - tail])
+    return float(low), float(high)
+
+
+def no_predictions_result(handle: str) -> Dict:
+    return {
+        "handle": handle,
+        "credibility_score": 0.0,
+        "prediction_stats": {
+            "total": 0,
+            "true": 0,
+            "false": 0,
+            "uncertain": 0
+        },
+        "message": "No predictions found for this user."
+    }
+
+
+def credibility_category(result: str) -> str:
+    result = str(result).upper()
+    return result.lower() if result in ("TRUE", "FALSE") else "uncertain"
 
-# Database connection
-db = Database()
+
+def apply_verification(record: Optional[Dict], prediction_key: str, result: str, now: float,
+                       half_life: float = CREDIBILITY_HALF_LIFE) -> Optional[Dict]:
+    """Fold one verification into a credibility record; returns the fields to $set, or None if nothing changes.
+
+    Weights decay exponentially with `half_life` from `last_update`, so the
+    update is O(1) however many verifications came before. A prediction that
+    was UNCERTAIN and is now resolved moves to its new category; anything
+    else already seen is not counted twice.
+    """
+    record = record or {}
+    category = credibility_category(result)
+    previous = record.get("seen", {}).get(prediction_key)
+    if previous and (previous["result"] == category or category == "uncertain"):
+        return None
+
+    counts = dict(record.get("counts") or {"total": 0, "true": 0, "false": 0, "uncertain": 0})
+    weights = dict(record.get("weights") or {"true": 0.0, "false": 0.0, "uncertain": 0.0})
+    if record.get("last_update"):
+        decay = 0.5 ** (max(0.0, now - record["last_update"]) / half_life)
+        weights = {key: weight * decay for key, weight in weights.items()}
+
+    if previous:
+        counts[previous["result"]] -= 1
+        previous_weight = 0.5 ** (max(0.0, now - previous["at"]) / half_life)
+        weights[previous["result"]] = max(0.0, weights[previous["result"]] - previous_weight)
+    else:
+        counts["total"] += 1
+    counts[category] += 1
+    weights[category] += 1.0
+
+    total_weight = sum(weights.values())
+    return {
+        "counts": counts,
+        "weights": weights,
+        "last_update": now,
+        "credibility_score": round(counts["true"] / counts["total"], 2),
+        "decayed_score": round(weights["true"] / total_weight, 2) if total_weight else 0.0,
+        f"seen.{prediction_key}": {"result": category, "at": now},
+    }
+
+
+def record_credibility(handle: str, prediction: str, verification: Dict, attempts: int = 5):
+    """Persist one finished verification into the handle's credibility record."""
+    handle = normalize_handle(handle)
+    prediction_key = make_key(normalize_text(prediction))
+    try:
+        for _ in range(attempts):
+            record = db.select_credibility(handle, prediction_key)
+            changes = apply_verification(record, prediction_key, verification["result"], time.time())
+            if changes is None:
+                return
+            if db.save_credibility(handle, changes, record.get("version") if record else None):
+                return
+        logger.info(f"Gave up updating credibility for {handle} after {attempts} conflicting writes")
+    except Exception as e:
+        logger.error(f"Could not record credibility for {handle}: {e}")
+
+
+def newest_tweet_id(tweet_ids: List[str]) -> Optional[str]:
+    ids = [int(tweet_id) for tweet_id in tweet_ids if tweet_id]
+    return str(max(ids)) if ids else None
+
+
+def newer_tweets(tweets: List[Dict], since_id: str) -> List[Dict]:
+    """Tweets posted after since_id, in the order Datura returned them."""
+    return [tweet for tweet in tweets if tweet.get("id") and int(tweet["id"]) > int(since_id)]
+
+
+def merge_analyses(old: Dict, new: Dict) -> Dict:
+    """Combine the descriptive fields of two prediction-pattern analyses, weighting by their prediction counts."""
+    old_count = old.get("total_predictions", 0)
+    new_count = new.get("total_predictions", 0)
+    total = old_count + new_count
+    if not old_count or "error" in old:
+        return new
+    if not new_count or "error" in new:
+        return old
+
+    patterns = list(dict.fromkeys(new.get("patterns", []) + old.get("patterns", [])))
+
+    # Descriptive fields come from whichever side covers more predictions
+    main = new if new_count > old_count else old
+    return {
+        "confidence_level": main.get("confidence_level", "N/A"),
+        "prediction_style": main.get("prediction_style", "N/A"),
+        "patterns": patterns,
+        "summary": main.get("summary", ""),
+        "total_predictions": total,
+    }
+
+
+PATTERN_ANALYSIS_PROMPT = """
+        You are an expert analyst of prediction patterns and behaviors.  
+        Analyze the following list of prediction tweets from a single user and provide a comprehensive analysis with the following information:
+
+        1. Their typical confidence level (certain, hedging, speculative)
+        2. Their prediction style (quantitative, qualitative, conditional)
+        3. Any patterns you notice in their prediction behavior
+
+        Format your response as JSON:
+        {
+            "confidence_level": "description of their confidence level",
+            "prediction_style": "description of their prediction style",
+            "patterns": ["pattern1", "pattern2", ...],
+            "summary": "A brief summary of this predictor's profile"
+        }
+
+        Ensure the response is **valid JSON** with no additional text.
+        """
+
+PATTERN_REDUCE_PROMPT = """
+        You are merging several partial analyses of one user's prediction tweets. Each partial analysis covers a different set of their predictions and lists how many predictions it covers.
+
+        Combine them into a single analysis of the user, weighting each partial by its number of predictions. Merge duplicate patterns and keep the most characteristic ones.
+
+        Format your response as JSON:
+        {
+            "confidence_level": "description of their confidence level",
+            "prediction_style": "description of their prediction style",
+            "patterns": ["pattern1", "pattern2", ...],
+            "summary": "A brief summary of this predictor's profile"
+        }
+
+        Ensure the response is **valid JSON** with no additional text.
+        """
+
+# Cached chunk analyses are tied to this prompt and model
+PATTERN_ANALYSIS_VERSION = make_key(PATTERN_ANALYSIS_PROMPT, MODEL_NAME)
+pattern_chunk_cache = TTLCache("pattern_chunks", maxsize=1024, ttl=PATTERN_CHUNK_CACHE_TTL, persist=True)
 
 # ============ COMPONENT 2: PREDICTOR PROFILE BUILDER ============
 
@@ -34,14 +329,27 @@ class PredictionProfiler:
         self.datura_api_key = datura_api_key
         self.datura_api_url = datura_api_url
 
-    async def get_profile(self, handle: str) -> Dict:
-        """Fetch profile from db and if not found, build it."""
+    async def get_profile(self, handle: str, refresh: bool = False, stored: Any = NOT_LOOKED_UP) -> Dict:
+        """Fetch profile from db and if not found, build it.
+
+        Stored profiles older than PROFILE_REFRESH_AFTER seconds (or any stored
+        profile when refresh=True) are brought up to date incrementally.
+        Concurrent calls for the same handle share a single lookup/build.
+        `stored` is the caller's own db lookup for the handle (None when not
+        found), which skips looking it up again.
+        """
+        return await profile_flights.do(normalize_handle(handle), self._get_profile, handle, refresh, stored)
+
+    async def _get_profile(self, handle: str, refresh: bool = False, stored: Any = NOT_LOOKED_UP) -> Dict:
         if handle.startswith("@"):
             handle = handle[1:]
 
         logger.info(f"Fetching profile for {handle}")
-        # Check if the profile exists in the database
-        response = db.select_profile(handle)     
+        if stored is NOT_LOOKED_UP:
+            # Check if the profile exists in the database (off the event loop, pymongo blocks)
+            response = await asyncio.to_thread(db.select_profile, handle)
+        else:
+            response = stored
         logger.info(f"Profile found: {response}")
 
         if response==None:
@@ -52,34 +360,50 @@ class PredictionProfiler:
             profile = response
             logger.info(f"Profile found in the database for {handle}: {profile}")
             print(f"Profile found in the database for {handle}: {profile}")
-        # If profile is found, return it
+        # If profile is found, return it (refreshed with any newer tweets if stale)
         if profile:
+            if needs_refresh(profile, refresh):
+                return await self.refresh_profile(profile)
             return profile
         
+        # Handles recently analyzed as non-predictors (or that errored) are answered from the negative cache
+        negative_key = normalize_handle(handle)
+        if not refresh:
+            negative = negative_profiles.get(negative_key)
+            if negative is not None:
+                logger.info(f"Negative cache hit for {handle}, analyzed at {negative['analyzed_at']}")
+                return profile_from_negative(negative)
+
         logger.info(f"Profile not found in the database for {handle}. Building profile...")
         print(f"Profile not found in the database for {handle}. Building profile...")
         # If not found, build the user profile
         profile = await self.build_profile(handle)
         
         # Check if profile is famous or is a good predictor
-        if profile["prediction_rate"] > 0.3:
+        if profile.get("prediction_rate", 0) > 0.3:
             # Save the new profile to the database
-            response = db.insert_profile(profile)
+            response = await asyncio.to_thread(db.insert_profile, profile)
+            negative_profiles.delete(negative_key)
 
             if response.inserted_id:
                 logger.info(f"Profile inserted into the database for {handle}: {profile}")
             else:
                 logger.info(f"Profile not inserted into the database for {handle}: {profile}")
+        elif "error" in profile:
+            negative_profiles.set(negative_key, {"handle": handle, "error": profile["error"], "analyzed_at": time.time()},
+                                  ttl=NEGATIVE_ERROR_TTL)
+        else:
+            negative_profiles.set(negative_key, negative_record(profile))
 
         return profile
 
-    async def build_user_profile(self, handle: str, max_retries: int = 5) -> Dict:
+    async def build_user_profile(self, handle: str, max_retries: int = 5, since_id: Optional[str] = None) -> Dict:
         print(handle)
         logger.info(handle)
         if handle.startswith("@"):
             handle = handle[1:]
 
-        """Fetch recent tweets from a specific user."""
+        """Fetch recent tweets from a specific user, optionally only those newer than since_id."""
         headers = {
             "Authorization": f"{self.datura_api_key}",
             "Content-Type": "application/json",
@@ -90,82 +414,100 @@ class PredictionProfiler:
             "query": "until:2024-9-28",
             "count": 50  #100
         }
+        if since_id:
+            # The fixed until: cutoff would leave nothing newer than the initial build to find
+            params["query"] = f"since_id:{since_id}"
         
-        for attempt in range(max_retries):
-            try:
-                response = await asyncio.to_thread(requests.get, "https://apis.datura.ai/twitter/post/user", params=params, headers=headers)
-                response.raise_for_status()
-                tweets_ls = response.json()
-                print(len(tweets_ls), "tweets found")
-                logger.info(f"tweets found: {len(tweets_ls)}")
-                if tweets_ls:
-                    tweets = [tweet.get("text", "") for tweet in tweets_ls]
-                    return {"tweets": tweets}
-                
-            except requests.exceptions.RequestException as e:
-                return {"error": f"Failed to fetch tweets: {str(e)}", "tweets": []}
-            
-            print(f"Attempt {attempt + 1} failed. Retrying...")
-            logger.info(f"Attempt {attempt + 1} failed. Retrying...")
-            await asyncio.sleep(2)
+        async def fetch_user_tweets(query):
+            response = await http_client.get("https://apis.datura.ai/twitter/post/user", params=dict(params, query=query), headers=headers)
+            response.raise_for_status()
+            tweets_ls = response.json()
+            print(len(tweets_ls), "tweets found")
+            logger.info(f"tweets found: {len(tweets_ls)}")
+            return tweets_ls
+
+        try:
+            # Having no tweets newer than since_id is a normal answer, not worth retrying
+            tweets_ls = await retry_policy.run("datura_user_tweets", fetch_user_tweets, params["query"],
+                                               retry_if_result=None if since_id else lambda tweets: not tweets,
+                                               max_attempts=max_retries)
+
+            if since_id:
+                page, new_page = tweets_ls, newer_tweets(tweets_ls, since_id)
+                tweets_ls = list(new_page)
+                pages = 1
+                # A full page with nothing at or before since_id may have skipped tweets; page back to since_id
+                while new_page and len(page) >= params["count"] and len(new_page) == len(page):
+                    if pages >= PROFILE_REFRESH_MAX_PAGES:
+                        logger.warning(f"Refresh of {handle} stopped after {pages} pages before reaching tweet {since_id}, "
+                                       f"older new tweets are skipped")
+                        break
+                    oldest_id = min(int(tweet["id"]) for tweet in new_page)
+                    page = await retry_policy.run("datura_user_tweets", fetch_user_tweets,
+                                                  f"since_id:{since_id} max_id:{oldest_id - 1}", max_attempts=max_retries)
+                    new_page = newer_tweets(page, since_id)
+                    tweets_ls += new_page
+                    pages += 1
+        except (httpx.HTTPError, ValueError, CircuitOpenError) as e:
+            return {"error": f"Failed to fetch tweets: {str(e)}", "tweets": []}
+
+        if since_id and not tweets_ls:
+            return {"tweets": [], "tweet_ids": []}
+
+        if tweets_ls:
+            tweets = [tweet.get("text", "") for tweet in tweets_ls]
+            tweet_ids = [str(tweet.get("id", "")) for tweet in tweets_ls]
+            return {"tweets": tweets, "tweet_ids": tweet_ids}
         
         return {"error": "Invalid Username. No tweets found after 5 attempts.", "tweets": []}
 
     async def filter_predictions(self, tweets: List[str]) -> Dict:
-        """Filter tweets to only include predictions, processing in batches of 25."""
-        # Initialize an empty list to store all prediction results
-        all_predictions = []
-        batch_size = 25
-        
-        # Process tweets in batches of 25
-        for i in range(0, len(tweets), batch_size):
-            batch_tweets = tweets[i:i+batch_size]
-            batch_tweet_list = "\n".join([f"{j+1}. {t}" for j, t in enumerate(batch_tweets)])
-            
-            system_context = """You are an expert in identifying **explicit and implicit predictions** in tweets that could be relevant to **Polymarket**, a prediction market platform. Polymarket users bet on **future events** in politics, policy, business, law, and geopolitics.
+        """Filter tweets to only include predictions.
 
-            **Definitions:**
-            1. **Explicit Prediction**: A direct statement about a future outcome (e.g., "X will happen," "Y is likely to pass").
-            2. **Implicit Prediction**: A statement implying a future outcome (e.g., "Senator proposes bill," "Protests may lead to...").
-
-            **Polymarket Topics Include:**
-            - Elections, legislation, court rulings
-            - Policy changes (tariffs, regulations)
-            - Business decisions (company moves, market impacts)
-            - Geopolitical events (wars, treaties, sanctions)
-            - Legal/Investigative outcomes (prosecutions, declassifications)
+        Near-duplicate tweets (retweets, copy-pasted posts) are classified once
+        and the label is fanned back out to every copy.
+        """
+        clusters = cluster_near_duplicates(tweets)
+        representative_outcomes = await self.classify_tweets([tweets[cluster[0]] for cluster in clusters])
 
-            **Important Instruction:** Be *generous* in your classification. If a tweet suggests even a plausible implication of a future event **relevant to Polymarket topics**, classify it as **"Yes"**. It is better to include weak signals than to exclude potentially relevant ones. When in doubt, lean toward **"Yes"**.
+        all_predictions = ["No"] * len(tweets)
+        for cluster, outcome in zip(clusters, representative_outcomes):
+            for index in cluster:
+                all_predictions[index] = outcome
+        
+        # Return combined results in the expected format
+        return {
+            "predictions": all_predictions,
+        }
 
-            **Exclude:**
-            - Past events (unless they imply future consequences)
-            - Pure opinions without any forecastable outcome
-            - Non-actionable statements (e.g., "People are struggling")
+    async def classify_tweets(self, tweets: List[str]) -> List[str]:
+        """Label each tweet "Yes"/"No", classifying batches of 25 concurrently.
 
-            **Examples:**
-            - "Trump will win in 2024" → **Yes (Explicit)**
-            - "Senator proposes bill to ban TikTok" → **Yes (Implicit)**
-            - "Nikki Haley is gaining ground in Iowa polls." → **Yes (Implicit)** (implies prediction market relevance)
-            - "Senate to vote on crypto regulation bill next week." → **Yes (Implicit)**
-            - "Will Russia use nuclear weapons in 2024?" → **Yes (Explicit)**
-            - "Israel expected to launch ground invasion of Gaza." → **Yes (Implicit)**
-            - "Elon Musk hints at stepping down as Twitter CEO." → **Yes (Implicit)**
-            - "The economy is collapsing" → **No** (No actionable prediction)
-            - "I miss when politicians actually cared about the people." → **No** (opinion, not predictive)
-            - "The economy crashed last year and it's all downhill from here." → **No** (past event, vague future implication)
-            - "Climate change is real." → **No** (statement, no actionable prediction)
+        Tweets found in the label cache or that the local classifier is
+        confident about skip the LLM. At most PROFILER_MAX_CONCURRENCY batches
+        are in flight; labels are written back by tweet index so the output
+        order matches the input.
+        """
+        cached_labels = profiler_label_cache.lookup(tweets)
+        misses = [i for i in range(len(tweets)) if i not in cached_labels]
+        local_labels, uncertain = profiler_classifier.split([tweets[i] for i in misses])
+        uncertain = [misses[i] for i in uncertain]
+        all_predictions = [cached_labels.get(i, "No") for i in range(len(tweets))]
+        for i, label in local_labels.items():
+            all_predictions[misses[i]] = label
+        batch_size = 25
+        semaphore = asyncio.Semaphore(PROFILER_MAX_CONCURRENCY)
 
-            **Task:** For each tweet, return **"Yes"** if it contains an explicit or implicit prediction relevant to Polymarket — even if it's subtle or implied. Respond *only* with a JSON object like:
-            {
-            "predictions": ["Yes", "No", ...]
-            }
-            """
+        async def classify_batch(batch_number: int, batch_indices: List[int]):
+            batch_tweets = [tweets[index] for index in batch_indices]
+            batch_tweet_list = "\n".join([f"{j+1}. {t}" for j, t in enumerate(batch_tweets)])
             
-            response = await asyncio.to_thread(self.groq_client.chat.completions.create,
-                model=MODEL_NAME1,
-                messages=[{"role": "system", "content": system_context},
-                        {"role": "user", "content": batch_tweet_list}]
-            )
+            async with semaphore:
+                response = await http_client.openai_client(self.groq_client).chat.completions.create(
+                    model=MODEL_NAME1,
+                    messages=[{"role": "system", "content": PREDICTION_FILTER_PROMPT},
+                            {"role": "user", "content": batch_tweet_list}]
+                )
             
             raw_output = response.choices[0].message.content
 
@@ -177,19 +519,26 @@ class PredictionProfiler:
             
             try:
                 parsed = json.loads(raw_output.encode().decode('utf-8-sig'))  # Removes BOM if present
-                # Extend the all_predictions list with the batch results
-                all_predictions.extend(parsed.get("predictions", []))
+                batch_predictions = parsed.get("predictions", [])
             except json.JSONDecodeError as e:
-                print(f"Failed to parse LLM response for batch {i//batch_size + 1}:")
-                logging.info(f"Failed to parse LLM response for batch {i//batch_size + 1}")
-                # If parsing fails, add "No" for each tweet in the batch as a fallback
-                all_predictions.extend(["No"] * len(batch_tweets))
-        
-        # Return combined results in the expected format
-        return {
-            "predictions": all_predictions,
-        }
+                print(f"Failed to parse LLM response for batch {batch_number}:")
+                logging.info(f"Failed to parse LLM response for batch {batch_number}")
+                # If parsing fails, fall back to "No" for each tweet in the batch
+                batch_predictions = []
 
+            if len(batch_predictions) == len(batch_tweets):
+                profiler_classifier.record(batch_tweets, batch_predictions)
+                profiler_label_cache.save(batch_tweets, batch_predictions)
+            for index, outcome in zip(batch_indices, batch_predictions):
+                all_predictions[index] = outcome
+
+        # Process the uncertain tweets in batches of 25, concurrently
+        await asyncio.gather(*(
+            classify_batch(i // batch_size + 1, uncertain[i:i+batch_size])
+            for i in range(0, len(uncertain), batch_size)
+        ))
+
+        return all_predictions
 
     async def apply_filter(self, tweets: List[str], outcomes: Dict) -> List[str]:
         """Apply prediction filter to tweets."""
@@ -201,7 +550,14 @@ class PredictionProfiler:
         return filtered_tweets
     
     async def analyze_prediction_patterns(self, filtered_tweets: List[str]) -> Dict:
-        """Analyze patterns in the user's predictions."""
+        """Analyze patterns in the user's predictions.
+
+        Topic percentages are computed locally by TopicAnalytics; the LLM only
+        writes the descriptive fields. Long histories are analyzed map-reduce
+        style: chunks of PATTERN_CHUNK_SIZE predictions are analyzed in
+        parallel (each chunk result is cached) and the partial analyses are
+        merged in a cheap reduce step.
+        """
         if not filtered_tweets:
             return {
                 "total_predictions": 0,
@@ -210,52 +566,85 @@ class PredictionProfiler:
                 "prediction_style": "N/A",
                 "summary": "No predictions found for this user."
             }
-        
-        tweet_list = "\n".join([f"{i+1}. {t}" for i, t in enumerate(filtered_tweets)])
-        
-        analysis_prompt = f"""
-        You are an expert analyst of prediction patterns and behaviors.  
-        Analyze the following list of prediction tweets from a single user and provide a comprehensive analysis with the following information:
 
-        1. The main topics this person makes predictions about (politics, crypto, sports, etc.)
-        2. Their typical confidence level (certain, hedging, speculative)
-        3. Their prediction style (quantitative, qualitative, conditional)
-        4. Any patterns you notice in their prediction behavior
+        chunks = chunk_predictions(filtered_tweets, PATTERN_CHUNK_SIZE)
+        if len(chunks) == 1:
+            analysis = await self.analyze_chunk(filtered_tweets)
+            analysis["topics"] = topic_distribution(filtered_tweets)
+            return analysis
 
-        Format your response as JSON:
-        {{
-            "topics": {{"topic1": percentage, "topic2": percentage, ...}},
-            "confidence_level": "description of their confidence level",
-            "prediction_style": "description of their prediction style",
-            "patterns": ["pattern1", "pattern2", ...],
-            "summary": "A brief summary of this predictor's profile"
-        }}
+        semaphore = asyncio.Semaphore(PROFILER_MAX_CONCURRENCY)
 
-        Ensure the response is **valid JSON** with no additional text.
-        """
+        async def analyze_with_limit(chunk):
+            async with semaphore:
+                return await self.analyze_chunk(chunk)
+
+        logger.info(f"Analyzing {len(filtered_tweets)} predictions in {len(chunks)} chunks")
+        partial_analyses = await asyncio.gather(*(analyze_with_limit(chunk) for chunk in chunks))
+        analysis = await self.reduce_analyses(partial_analyses)
+        analysis["total_predictions"] = len(filtered_tweets)
+        analysis["topics"] = topic_distribution(filtered_tweets)
+        return analysis
+
+    async def analyze_chunk(self, chunk_tweets: List[str]) -> Dict:
+        """Analyze one chunk of predictions, reusing a cached result for an identical chunk."""
+        cache_key = make_key(PATTERN_ANALYSIS_VERSION, chunk_tweets)
+        cached_analysis = pattern_chunk_cache.get(cache_key)
+        if cached_analysis is not None:
+            return cached_analysis
+
+        tweet_list = "\n".join([f"{i+1}. {t}" for i, t in enumerate(chunk_tweets)])
         
-        response = await asyncio.to_thread(self.groq_client.chat.completions.create,
+        response = await http_client.openai_client(self.groq_client).chat.completions.create(
             model=MODEL_NAME,
-            messages=[{"role": "system", "content": analysis_prompt},
+            messages=[{"role": "system", "content": PATTERN_ANALYSIS_PROMPT},
                       {"role": "user", "content": tweet_list}]
         )
         
         raw_output = response.choices[0].message.content
-        
-        # Extract JSON from response
-        match = re.search(r"\{(.*)\}", raw_output, re.DOTALL)
-        json_content = "{" + match.group(1) + "}"
-        
-        try:
-            analysis = json.loads(json_content)
-            analysis["total_predictions"] = len(filtered_tweets)
-            return analysis
-        except json.JSONDecodeError:
+        analysis = parse_json_object(raw_output)
+        if analysis is None:
+            # Truncated or malformed output; don't cache it so the next run retries
             return {
-                "total_predictions": len(filtered_tweets),
+                "total_predictions": len(chunk_tweets),
                 "error": "Could not parse analysis",
                 "raw_output": raw_output
             }
+
+        analysis["total_predictions"] = len(chunk_tweets)
+        pattern_chunk_cache.set(cache_key, analysis)
+        return analysis
+
+    async def reduce_analyses(self, partial_analyses: List[Dict]) -> Dict:
+        """Merge the descriptive fields of chunk analyses with one small-model call."""
+        valid = [analysis for analysis in partial_analyses if "error" not in analysis]
+        if not valid:
+            return {"error": "Could not parse analysis"}
+
+        analysis = valid[0]
+        for partial in valid[1:]:
+            analysis = merge_analyses(analysis, partial)
+        if len(valid) == 1:
+            return analysis
+
+        partial_summaries = json.dumps([
+            {key: partial.get(key) for key in ("total_predictions", "confidence_level", "prediction_style", "patterns", "summary")}
+            for partial in valid
+        ], indent=2)
+        response = await http_client.openai_client(self.groq_client).chat.completions.create(
+            model=MODEL_NAME1,
+            messages=[{"role": "system", "content": PATTERN_REDUCE_PROMPT},
+                      {"role": "user", "content": partial_summaries}]
+        )
+        merged = parse_json_object(response.choices[0].message.content)
+        if merged is None:
+            logger.info("Could not parse reduced analysis, keeping the weighted merge")
+            return analysis
+
+        for key in ("confidence_level", "prediction_style", "patterns", "summary"):
+            if merged.get(key):
+                analysis[key] = merged[key]
+        return analysis
     
     async def build_profile(self, handle: str) -> Dict:
         """Main method to build a predictor's profile."""
@@ -283,16 +672,62 @@ class PredictionProfiler:
             "prediction_tweets": filtered_predictions,
             "prediction_count": len(filtered_predictions),
             "prediction_rate": len(filtered_predictions) / len(user_data["tweets"]) if user_data["tweets"] else 0,
-            "analysis": analysis
+            "analysis": analysis,
+            "newest_tweet_id": newest_tweet_id(user_data.get("tweet_ids", [])),
+            "updated_at": time.time()
         }
         
         return profile
 
+    async def refresh_profile(self, profile: Dict) -> Dict:
+        """Update a stored profile with only the tweets posted since it was built."""
+        handle = profile["handle"]
+        logger.info(f"Refreshing profile for {handle} since tweet {profile['newest_tweet_id']}")
+        user_data = await self.build_user_profile(handle, since_id=profile["newest_tweet_id"])
+        if "error" in user_data:
+            # Keep serving the stored profile if Datura is unavailable
+            logger.info(f"Could not refresh profile for {handle}: {user_data['error']}")
+            return profile
+
+        new_tweets = user_data["tweets"]
+        profile = dict(profile, updated_at=time.time())
+        if new_tweets:
+            prediction_outcomes = await self.filter_predictions(new_tweets)
+            new_predictions = await self.apply_filter(new_tweets, prediction_outcomes)
+            # Datura returns newest first, keep that order
+            profile["prediction_tweets"] = new_predictions + profile["prediction_tweets"]
+            if new_predictions:
+                # Older chunks hit the chunk cache, so only the newest chunk and the reduce step cost a call
+                profile["analysis"] = await self.analyze_prediction_patterns(profile["prediction_tweets"])
+            profile["prediction_count"] = len(profile["prediction_tweets"])
+            profile["total_tweets_analyzed"] += len(new_tweets)
+            profile["prediction_rate"] = profile["prediction_count"] / profile["total_tweets_analyzed"]
+            profile["newest_tweet_id"] = newest_tweet_id(user_data["tweet_ids"] + [profile["newest_tweet_id"]])
+            logger.info(f"Profile for {handle}: {len(new_predictions)} new predictions from {len(new_tweets)} new tweets")
+
+        await asyncio.to_thread(db.update_profile, profile)
+        return profile
+
     async def get_profiles(self, handles: List[str]) -> List[Dict]:
-        # Get profiles for multiple handles concurrently.
-        tasks = [self.get_profile(handle) for handle in handles]
-        profiles = await asyncio.gather(*tasks)
-        return profiles
+        # Get profiles for multiple handles: one bulk DB lookup, then build only the misses concurrently.
+        unique_handles = dedupe_handles(handles)
+        lookup_handles = {key: handle.strip().lstrip("@") for key, handle in unique_handles.items()}
+        stored = await asyncio.to_thread(db.select_profiles, list(lookup_handles.values()))
+
+        profiles = {}
+        misses = []
+        for key, handle in lookup_handles.items():
+            profile = stored.get(handle)
+            if profile and not needs_refresh(profile):
+                profiles[key] = profile
+            else:
+                misses.append(key)
+        logger.info(f"get_profiles: {len(profiles)} stored, {len(misses)} to build or refresh")
+
+        built = await asyncio.gather(*(self.get_profile(unique_handles[key], stored=stored.get(lookup_handles[key]))
+                                       for key in misses))
+        profiles.update(zip(misses, built))
+        return [profiles[normalize_handle(handle)] for handle in handles]
     
     """
     async def build_profiles(self, handles: List[str]) -> List[Dict]:
@@ -302,69 +737,99 @@ class PredictionProfiler:
         return profiles
     """
 
-    async def calculate_credibility_score(self, handle: str, prediction_verifier: PredictionVerifier) -> Dict:
+    async def calculate_credibility_score(self, handle: str, prediction_verifier: PredictionVerifier,
+                                          verify: Optional[Callable[[str], Awaitable[Dict]]] = None) -> Dict:
         """Calculate credibility score asynchronously for a single handle."""
+        result = {}
+        async for update in self.stream_credibility_score(handle, prediction_verifier, verify=verify):
+            if update["type"] == "result":
+                result = update["result"]
+        return result
+
+    async def stream_credibility_score(self, handle: str, prediction_verifier: PredictionVerifier,
+                                       verify: Optional[Callable[[str], Awaitable[Dict]]] = None) -> AsyncIterator[Dict]:
+        """Yield credibility progress for a handle as verifications complete.
+
+        Every finished verification yields a {"type": "verification"} update
+        with the prediction, its verification, the counts so far and a
+        provisional score (TRUE share of the predictions verified so far). The
+        last update is {"type": "result"} carrying the same result
+        calculate_credibility_score returns. `verify` overrides how a single
+        prediction is verified; by default it runs the verifier through the
+        shared scheduler.
+        """
         # Await the profile retrieval
         profile = await self.get_profile(handle)
 
         if "error" in profile:
-            return {"error": profile["error"]}
+            yield {"type": "result", "result": {"error": profile["error"]}}
+            return
 
         if not profile["prediction_tweets"]:
-            return {
-                "handle": handle,
-                "credibility_score": 0.0,
-                "prediction_stats": {
-                    "total": 0,
-                    "true": 0,
-                    "false": 0,
-                    "uncertain": 0
-                },
-                "message": "No predictions found for this user."
-            }
+            yield {"type": "result", "result": no_predictions_result(handle)}
+            return
+
+        if verify is None:
+            search_queries = await self.precompute_search_queries(prediction_verifier, profile["prediction_tweets"])
+            verify = self.scheduled_verifier(handle, prediction_verifier, search_queries)
+
+        predictions = profile["prediction_tweets"]
 
         # Track verification results
         verification_stats = {
-            "total": len(profile["prediction_tweets"]),
+            "total": len(predictions),
             "true": 0,
             "false": 0,
             "uncertain": 0,
-            "verifications": []
+            "verifications": [None] * len(predictions)
         }
 
-        async def verify_prediction_async(prediction):
-            """Run prediction verification in a separate thread (avoids blocking)."""
-            return await asyncio.to_thread(prediction_verifier.verify_prediction, prediction)
+        async def verify_indexed(index, prediction):
+            return index, await verify(prediction)
 
-        # Run all verifications concurrently
-        verification_results = await asyncio.gather(
-            *(verify_prediction_async(prediction) for prediction in profile["prediction_tweets"])
-        )
-
-        # Process verification results
-        for prediction, verification in zip(profile["prediction_tweets"], verification_results):
-            if verification["result"] == "TRUE":
-                verification_stats["true"] += 1
-            elif verification["result"] == "FALSE":
-                verification_stats["false"] += 1
-            else:  # UNCERTAIN
-                verification_stats["uncertain"] += 1
-
-            verification_stats["verifications"].append({
-                "prediction": prediction,
-                "result": verification["result"],
-                "summary": verification["summary"],
-                "sources": verification["sources"]
-            })
+        tasks = [asyncio.ensure_future(verify_indexed(i, prediction)) for i, prediction in enumerate(predictions)]
+        try:
+            for completed, next_verification in enumerate(asyncio.as_completed(tasks), start=1):
+                index, verification = await next_verification
+                if verification["result"] == "TRUE":
+                    verification_stats["true"] += 1
+                elif verification["result"] == "FALSE":
+                    verification_stats["false"] += 1
+                else:  # UNCERTAIN
+                    verification_stats["uncertain"] += 1
+
+                verified_prediction = {
+                    "prediction": predictions[index],
+                    "result": verification["result"],
+                    "summary": verification["summary"],
+                    "sources": verification["sources"]
+                }
+                verification_stats["verifications"][index] = verified_prediction
+                await asyncio.to_thread(record_credibility, handle, predictions[index], verification)
+
+                yield {
+                    "type": "verification",
+                    "handle": handle,
+                    "verification": verified_prediction,
+                    "completed": completed,
+                    "credibility_score": round(verification_stats["true"] / completed, 2),
+                    "prediction_stats": {
+                        "total": verification_stats["total"],
+                        "true": verification_stats["true"],
+                        "false": verification_stats["false"],
+                        "uncertain": verification_stats["uncertain"]
+                    }
+                }
+        finally:
+            # The consumer may stop early; don't leave verifications running in the background
+            for task in tasks:
+                task.cancel()
 
         # Calculate credibility score
-        if verification_stats["total"] > 0:
-            credibility_score = verification_stats["true"] / verification_stats["total"]
-        else:
-            credibility_score = 0.0
+        credibility_score = verification_stats["true"] / verification_stats["total"]
 
         # Create the final result
-        result = {
+        yield {"type": "result", "result": {
             "handle": handle,
             "credibility_score": round(credibility_score, 2),
             "prediction_stats": {
@@ -375,12 +840,181 @@ class PredictionProfiler:
             },
             "verified_predictions": verification_stats["verifications"],
             "profile_summary": profile["analysis"].get("summary", "")
+        }}
+
+    async def estimate_credibility_score(self, handle: str, prediction_verifier: PredictionVerifier,
+                                         max_width: float = CREDIBILITY_CI_WIDTH, budget: int = CREDIBILITY_SAMPLE_BUDGET,
+                                         verify: Optional[Callable[[str], Awaitable[Dict]]] = None) -> Dict:
+        """Estimate a handle's credibility score by verifying a random sample of its predictions.
+
+        Predictions are verified in random order while a Beta posterior over
+        the TRUE rate is updated; sampling stops once the credible interval is
+        at most `max_width` wide (after CREDIBILITY_MIN_SAMPLES verifications),
+        the `budget` of verifications is spent, or every prediction is verified.
+        """
+        profile = await self.get_profile(handle)
+
+        if "error" in profile:
+            return {"error": profile["error"]}
+
+        predictions = profile["prediction_tweets"]
+        if not predictions:
+            return no_predictions_result(handle)
+
+        budget = min(budget, len(predictions)) if budget > 0 else len(predictions)
+        order = random.sample(range(len(predictions)), len(predictions))
+        if verify is None:
+            search_queries = await self.precompute_search_queries(prediction_verifier, [predictions[i] for i in order[:budget]])
+            verify = self.scheduled_verifier(handle, prediction_verifier, search_queries)
+
+        stats = {"true": 0, "false": 0, "uncertain": 0}
+        verified_predictions = []
+        interval = (0.0, 1.0)
+        stop_reason = "budget" if budget < len(predictions) else "exhausted"
+
+        async def verify_indexed(index):
+            return index, await verify(predictions[index])
+
+        pending = set()
+        launched = 0
+        try:
+            while True:
+                while launched < budget and len(pending) < CREDIBILITY_SAMPLE_CONCURRENCY:
+                    pending.add(asyncio.ensure_future(verify_indexed(order[launched])))
+                    launched += 1
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index, verification = task.result()
+                    if verification["result"] == "TRUE":
+                        stats["true"] += 1
+                    elif verification["result"] == "FALSE":
+                        stats["false"] += 1
+                    else:  # UNCERTAIN
+                        stats["uncertain"] += 1
+                    verified_predictions.append({
+                        "prediction": predictions[index],
+                        "result": verification["result"],
+                        "summary": verification["summary"],
+                        "sources": verification["sources"]
+                    })
+                    await asyncio.to_thread(record_credibility, handle, predictions[index], verification)
+
+                # Like the full score, UNCERTAIN counts against the TRUE rate
+                interval = beta_credible_interval(stats["true"], stats["false"] + stats["uncertain"])
+                if len(verified_predictions) >= CREDIBILITY_MIN_SAMPLES and interval[1] - interval[0] <= max_width:
+                    stop_reason = "converged"
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+
+        verified_count = len(verified_predictions)
+        logger.info(f"Estimated credibility for {handle} from {verified_count}/{len(predictions)} predictions ({stop_reason})")
+        return {
+            "handle": handle,
+            "credibility_score": round(stats["true"] / verified_count, 2),
+            "credible_interval": [round(interval[0], 2), round(interval[1], 2)],
+            "confidence": CREDIBILITY_CONFIDENCE,
+            "verified_count": verified_count,
+            "stop_reason": stop_reason,
+            "prediction_stats": {
+                "total": len(predictions),
+                "true": stats["true"],
+                "false": stats["false"],
+                "uncertain": stats["uncertain"]
+            },
+            "verified_predictions": verified_predictions,
+            "profile_summary": profile["analysis"].get("summary", "")
         }
 
-        return result
+    async def get_credibility(self, handle: str) -> Optional[Dict]:
+        """Stored credibility of a handle (counts, decayed weights and scores), without verifying anything."""
+        return await asyncio.to_thread(db.select_credibility, normalize_handle(handle))
+
+    def scheduled_verifier(self, handle: str, prediction_verifier: PredictionVerifier,
+                           search_queries: Optional[Dict[str, str]] = None) -> Callable[[str], Awaitable[Dict]]:
+        """Verify one prediction within the shared scheduler's limits, with its precomputed search query if any.
+
+        Cached verdicts are returned straight away instead of queueing for a
+        slot behind other handles' verifications.
+        """
+        search_queries = search_queries or {}
+
+        async def verify(prediction):
+            cached_result = prediction_verifier.cached_verification(prediction)
+            if cached_result is not None:
+                return cached_result
+            return await verification_scheduler.run(
+                normalize_handle(handle), prediction_verifier.verify_prediction, prediction, search_queries.get(prediction)
+            )
+        return verify
+
+    async def precompute_search_queries(self, prediction_verifier: PredictionVerifier, predictions: List[str]) -> Dict[str, str]:
+        """Generate search queries for the predictions not already verified, in batched LLM calls."""
+        uncached = [prediction for prediction in dict.fromkeys(predictions)
+                    if prediction_verifier.cached_verification(prediction) is None]
+        if not uncached:
+            return {}
+        try:
+            queries = await prediction_verifier.generate_search_queries(uncached)
+            return {prediction: query for prediction, query in zip(uncached, queries) if query}
+        except Exception as e:
+            # verify_prediction generates any missing query itself
+            logger.error(f"Could not precompute search queries: {e}")
+            return {}
 
     async def calculate_credibility_scores_batch(self, handles: List[str], prediction_verifier: PredictionVerifier) -> List[Dict]:
-        """Calculate credibility scores for multiple users concurrently."""
-        tasks = [self.calculate_credibility_score(handle, prediction_verifier) for handle in handles]
-        return await asyncio.gather(*tasks)
+        """Calculate credibility scores for multiple users concurrently, once per distinct handle.
+
+        Identical and near-identical predictions across the batch (retweets,
+        copied calls) are verified once and the result attributed to every
+        handle that made them.
+        """
+        unique_handles = dedupe_handles(handles)
+        profiles = await self.get_profiles(list(unique_handles.values()))
+
+        # Distinct predictions across the batch, then near-duplicate clusters over them
+        texts = []
+        text_index = {}
+        for profile in profiles:
+            for prediction in profile.get("prediction_tweets", []):
+                normalized = normalize_text(prediction)
+                if normalized not in text_index:
+                    text_index[normalized] = len(texts)
+                    texts.append(prediction)
+        representative = {}
+        for cluster in cluster_near_duplicates(texts):
+            for i in cluster:
+                representative[i] = cluster[0]
+        total_predictions = sum(len(profile.get("prediction_tweets", [])) for profile in profiles)
+        logger.info(f"Credibility batch: {total_predictions} predictions across {len(profiles)} handles, {len(set(representative.values()))} distinct to verify")
+
+        search_queries = await self.precompute_search_queries(
+            prediction_verifier, [texts[i] for i in sorted(set(representative.values()))]
+        )
+        shared_verifications = {}
+
+        def shared_verifier(handle):
+            scheduled = self.scheduled_verifier(handle, prediction_verifier, search_queries)
+
+            async def verify(prediction):
+                index = text_index.get(normalize_text(prediction))
+                if index is None:
+                    # Profile changed since the batch lookup
+                    return await scheduled(prediction)
+                index = representative[index]
+                # scheduled() answers cached verdicts without taking a slot
+                if index not in shared_verifications:
+                    shared_verifications[index] = asyncio.ensure_future(scheduled(texts[index]))
+                # Other handles may still be waiting on it if this one is cancelled
+                return await asyncio.shield(shared_verifications[index])
+            return verify
+
+        tasks = [self.calculate_credibility_score(handle, prediction_verifier, verify=shared_verifier(handle))
+                 for handle in unique_handles.values()]
+        results = dict(zip(unique_handles.keys(), await asyncio.gather(*tasks)))
+        return [results[normalize_handle(handle)] for handle in handles]
 
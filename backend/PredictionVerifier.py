@@ -1,10 +1,14 @@
+import asyncio
 import json
-from typing import List, Dict
-import requests
+from typing import List, Dict, Optional
+import httpx
 import re
 import os 
-from datura_py import Datura
 import time
+from .HttpClient import http_client
+from .RetryPolicy import retry_policy, CircuitOpenError
+from .Scheduler import ProcessLimit
+from .Cache import TTLCache, make_key, normalize_text
 from dotenv import load_dotenv
 import logging
 dotenv_path = "C:\Amit_Laptop_backup\Imperial_essentials\AI Society\Hackathon Torus\.env"
@@ -18,36 +22,26 @@ MODEL_NAME = os.environ.get("MODEL_NAME", "gpt-4o-2024-08-06")
 
 DATURA_API_KEY = os.environ.get("DATURA_API_KEY")
 
-# ============ COMPONENT 3: PREDICTOR VERIFIER ============
+DATURA_WEB_SEARCH_URL = "https://apis.datura.ai/web"
 
-class PredictionVerifier:
-    """Verifies whether predictions have come true or proven false."""
-    
-    def __init__(self, groq_client, news_api_token, google_api_key, google_cse_id):
-        self.groq_client = groq_client
-        self.news_api_token = news_api_token
-        self.google_api_key = google_api_key
-        self.google_cse_id = google_cse_id
-        self.datura = Datura(api_key=DATURA_API_KEY)
-    
-    def fetch_google_results(self, query: str) -> List[Dict]:
-        """Fetch search results from Google Custom Search API."""
-        google_url = f"https://www.googleapis.com/customsearch/v1?q={query}&key={self.google_api_key}&cx={self.google_cse_id}&num=3"
-        
-        response = requests.get(google_url)
-        # print("Google URL", response)
-        if response.status_code == 200:
-            data = response.json()
-            # print("Google data", data)
-            print("Capturing the data", data.get("data", []))
-            logging.info(f"Google API response: {data}")
-            return data.get("items", [])[:2]
-        
-        return []
+# Per-upstream limits on calls in flight, shared by every event loop in the process
+VERIFY_LLM_CONCURRENCY = int(os.environ.get("VERIFY_LLM_CONCURRENCY", "8"))
+VERIFY_DATURA_CONCURRENCY = int(os.environ.get("VERIFY_DATURA_CONCURRENCY", "4"))
+VERIFY_GOOGLE_CONCURRENCY = int(os.environ.get("VERIFY_GOOGLE_CONCURRENCY", "4"))
 
-    def generate_search_query(self, prediction_query: str) -> str:
-        """Generate a concise question-style search query from a multi-paragraph prediction tweet."""
-        context = """
+llm_limit = ProcessLimit("verify_llm", VERIFY_LLM_CONCURRENCY)
+datura_limit = ProcessLimit("verify_datura", VERIFY_DATURA_CONCURRENCY)
+google_limit = ProcessLimit("verify_google", VERIFY_GOOGLE_CONCURRENCY)
+
+# Predictions per batched search-query generation call
+SEARCH_QUERY_BATCH_SIZE = int(os.environ.get("SEARCH_QUERY_BATCH_SIZE", "25"))
+
+# TRUE/FALSE outcomes don't change, so they never expire; UNCERTAIN ones are retried after this many seconds
+VERIFICATION_UNCERTAIN_TTL = float(os.environ.get("VERIFICATION_UNCERTAIN_TTL", str(24 * 3600)))
+VERIFICATION_CACHE_SIZE = int(os.environ.get("VERIFICATION_CACHE_SIZE", "4096"))
+verification_cache = TTLCache("verifications", maxsize=VERIFICATION_CACHE_SIZE, ttl=0, persist=True)
+
+SEARCH_QUERY_PROMPT = """
         You are an expert at analyzing long prediction tweets (2-3 paragraphs) and extracting the core prediction to create concise, question-style search queries for Perplexica.
 
         Guidelines:
@@ -75,60 +69,18 @@ class PredictionVerifier:
 
         Now generate a concise question query (only the question, no extra text) for this prediction tweet:
         """
-        
-        completion = self.groq_client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": context},
-                {"role": "user", "content": prediction_query},
-            ],
-        )
-        
-        return completion.choices[0].message.content.strip()
-
-    def fetch_news_articles(self, search_query: str) -> List[Dict]:
-        """Fetch news articles related to the prediction, with up to 5 retries."""
-
-        max_retries = 5
-        delay = 1  # Start with 1 second delay
-
-        for attempt in range(1, max_retries + 1):
-            try:
-                result = self.datura.basic_web_search(
-                    query=search_query,
-                    num=5,
-                    start=1
-                )
-
-                data = result.get("data", [])
 
-                print(f"Attempt {attempt}: Captured data ->", data)
-                logging.info(f"Attempt {attempt}: Datura API response: {data}")
-                if data:  # If we got results, return them
-                    return data
+SEARCH_QUERY_BATCH_PROMPT = SEARCH_QUERY_PROMPT.replace(
+    "Now generate a concise question query (only the question, no extra text) for this prediction tweet:",
+    """You will receive a JSON object mapping an id to each prediction tweet. Generate one concise question query per tweet.
 
-            except Exception as e:
-                print(f"Attempt {attempt} failed with error: {e}")
-                logging.error(f"Attempt {attempt} failed with error: {e}")
-            # If we're not on the last attempt, wait and retry
-            if attempt < max_retries:
-                time.sleep(delay)
-                delay *= 2  # Optional: exponential backoff
+        Respond with a JSON object mapping every id to its query (only the question, no extra text), for example:
+        {"1": "Could Bitcoin hit $100k in 2021?", "2": "Was Trump likely to win the 2016 election?"}
 
-        # After all retries fail
-        print("All attempts failed. Returning empty list.")
-        logging.info("All attempts failed. Returning empty list.")
-        return []
+        Ensure the response is **valid JSON** with no additional text."""
+)
 
-    def analyze_verification(self, prediction_query: str, all_sources: List[Dict]) -> Dict:
-        """Analyze the sources to determine if the prediction was accurate."""
-        article_summaries = "\n".join(
-            [f"Title: {src['title']}, Source: {src['source']}, Description: {src['description']}" for src in all_sources]
-        )
-
-        print("Okay analyze_verification")
-        logging.info("Analyzing verification for prediction:")
-        system_prompt = """
+VERIFICATION_SYSTEM_PROMPT = """
         You are an AI analyst verifying predictions for Polymarket, a prediction market where users bet on real-world outcomes. Your task is to classify claims as TRUE, FALSE, or UNCERTAIN *only when evidence is insufficient*.
 
         ### Rules:
@@ -146,9 +98,9 @@ class PredictionVerifier:
         - If sources conflict, weigh authoritative sources (e.g., Reuters) higher than fringe outlets.
         - If timing is unclear (e.g., "will happen next week" but no update), default to ⁠ UNCERTAIN ⁠.
         
-        """       
+        """
 
-        analysis_prompt = f"""
+VERIFICATION_ANALYSIS_PROMPT = """
         The prediction is: "{prediction_query}". 
 
         Here are some recent news articles about this topic:
@@ -164,14 +116,159 @@ class PredictionVerifier:
 
         Ensure the response is *valid JSON* with no additional text.
         """
+
+# Cached verdicts are tied to the model and the verification prompts
+VERIFICATION_VERSION = make_key(MODEL_NAME, VERIFICATION_SYSTEM_PROMPT, VERIFICATION_ANALYSIS_PROMPT)
+
+
+def verification_key(prediction_query: str) -> str:
+    return make_key(VERIFICATION_VERSION, normalize_text(prediction_query))
+
+
+# ============ COMPONENT 3: PREDICTOR VERIFIER ============
+
+class PredictionVerifier:
+    """Verifies whether predictions have come true or proven false."""
+    
+    def __init__(self, groq_client, news_api_token, google_api_key, google_cse_id):
+        self.groq_client = groq_client
+        self.news_api_token = news_api_token
+        self.google_api_key = google_api_key
+        self.google_cse_id = google_cse_id
+    
+    async def fetch_google_results(self, query: str) -> List[Dict]:
+        """Fetch search results from Google Custom Search API."""
+        google_url = "https://www.googleapis.com/customsearch/v1"
+        params = {"q": query, "key": self.google_api_key, "cx": self.google_cse_id, "num": 3}
+
+        async def search_google():
+            async with google_limit:
+                response = await http_client.get(google_url, params=params)
+            response.raise_for_status()
+            return response
+
+        try:
+            response = await retry_policy.run("google_search", search_google)
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            logging.error(f"Google API request failed: {e}")
+            return []
+        # print("Google URL", response)
+        if response.status_code == 200:
+            data = response.json()
+            # print("Google data", data)
+            print("Capturing the data", data.get("data", []))
+            logging.info(f"Google API response: {data}")
+            return data.get("items", [])[:2]
         
-        ai_verification = self.groq_client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": analysis_prompt},
-            ],
+        return []
+
+    async def generate_search_query(self, prediction_query: str) -> str:
+        """Generate a concise question-style search query from a multi-paragraph prediction tweet."""
+        async with llm_limit:
+            completion = await http_client.openai_client(self.groq_client).chat.completions.create(
+                model=MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": SEARCH_QUERY_PROMPT},
+                    {"role": "user", "content": prediction_query},
+                ],
+            )
+        
+        return completion.choices[0].message.content.strip()
+
+    async def generate_search_queries(self, predictions: List[str]) -> List[Optional[str]]:
+        """Generate search queries for many predictions with one LLM call per SEARCH_QUERY_BATCH_SIZE predictions.
+
+        Predictions the batch answer leaves out or garbles fall back to
+        generate_search_query one by one; the query is None where that fails too.
+        """
+        batches = [predictions[i:i + SEARCH_QUERY_BATCH_SIZE] for i in range(0, len(predictions), SEARCH_QUERY_BATCH_SIZE)]
+        queries = []
+        for batch_queries in await asyncio.gather(*(self._generate_search_query_batch(batch) for batch in batches)):
+            queries.extend(batch_queries)
+        return queries
+
+    async def _generate_search_query_batch(self, predictions: List[str]) -> List[Optional[str]]:
+        numbered = {str(i + 1): prediction for i, prediction in enumerate(predictions)}
+        queries = {}
+        try:
+            async with llm_limit:
+                completion = await http_client.openai_client(self.groq_client).chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=[
+                        {"role": "system", "content": SEARCH_QUERY_BATCH_PROMPT},
+                        {"role": "user", "content": json.dumps(numbered, indent=2)},
+                    ],
+                )
+            match = re.search(r"\{.*\}", completion.choices[0].message.content, re.DOTALL)
+            if match:
+                queries = json.loads(match.group(0))
+        except Exception as e:
+            logging.error(f"Batched search query generation failed: {e}")
+        if not isinstance(queries, dict):
+            queries = {}
+
+        missing = [key for key in numbered if not isinstance(queries.get(key), str) or not queries[key].strip()]
+        if missing:
+            logging.info(f"Generating {len(missing)} of {len(numbered)} search queries one by one")
+            fallbacks = await asyncio.gather(*(self.generate_search_query(numbered[key]) for key in missing),
+                                             return_exceptions=True)
+            for key, query in zip(missing, fallbacks):
+                if isinstance(query, Exception):
+                    # Only this prediction goes without a precomputed query
+                    logging.error(f"Search query generation failed: {query}")
+                    queries[key] = None
+                else:
+                    queries[key] = query
+        return [queries[key].strip() if queries[key] else None for key in numbered]
+
+    async def fetch_news_articles(self, search_query: str) -> List[Dict]:
+        """Fetch news articles related to the prediction, retrying per the shared retry policy."""
+        headers = {"Authorization": f"{DATURA_API_KEY}"}
+        params = {"query": search_query, "num": 5, "start": 1}
+
+        async def search_news():
+            async with datura_limit:
+                response = await http_client.get(DATURA_WEB_SEARCH_URL, params=params, headers=headers)
+            response.raise_for_status()
+            data = response.json().get("data", [])
+            print("Captured data ->", data)
+            logging.info(f"Datura API response: {data}")
+            return data
+
+        try:
+            return await retry_policy.run("datura_web_search", search_news, retry_if_result=lambda data: not data)
+        except CircuitOpenError as e:
+            logging.info(f"{e}. Returning empty list.")
+        except Exception as e:
+            print(f"Fetching news articles failed with error: {e}")
+            logging.error(f"Fetching news articles failed with error: {e}")
+
+        # After all retries fail
+        print("All attempts failed. Returning empty list.")
+        logging.info("All attempts failed. Returning empty list.")
+        return []
+
+    async def analyze_verification(self, prediction_query: str, all_sources: List[Dict]) -> Dict:
+        """Analyze the sources to determine if the prediction was accurate."""
+        article_summaries = "\n".join(
+            [f"Title: {src['title']}, Source: {src['source']}, Description: {src['description']}" for src in all_sources]
         )
+
+        print("Okay analyze_verification")
+        logging.info("Analyzing verification for prediction:")
+
+        analysis_prompt = VERIFICATION_ANALYSIS_PROMPT.format(
+            prediction_query=prediction_query, article_summaries=article_summaries
+        )
+        
+        async with llm_limit:
+            ai_verification = await http_client.openai_client(self.groq_client).chat.completions.create(
+                model=MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": VERIFICATION_SYSTEM_PROMPT},
+                    {"role": "user", "content": analysis_prompt},
+                ],
+            )
         
         match = re.search(r"\{(.*)\}", ai_verification.choices[0].message.content, re.DOTALL)
         if match:
@@ -190,18 +287,39 @@ class PredictionVerifier:
                 "summary": "Could not analyze the prediction due to formatting issues."
             }
     
-    def verify_prediction(self, prediction_query: str) -> Dict:
-        """Main method to verify a prediction."""
+    def cached_verification(self, prediction_query: str) -> Optional[Dict]:
+        return verification_cache.get(verification_key(prediction_query))
+
+    async def verify_prediction(self, prediction_query: str, search_query: Optional[str] = None) -> Dict:
+        """Main method to verify a prediction, served from the verification cache when possible.
+
+        `search_query` skips query generation, e.g. when it was generated in a
+        batch with generate_search_queries.
+        """
+        cached_result = self.cached_verification(prediction_query)
+        if cached_result is not None:
+            logging.info("Serving verification from cache")
+            return cached_result
+
+        final_result = await self._verify_prediction(prediction_query, search_query)
+        final_result["verified_at"] = time.time()
+        if final_result["sources"]:
+            # Without sources (both searches failed or found nothing) the verdict says nothing; try again next time
+            ttl = VERIFICATION_UNCERTAIN_TTL if final_result["result"] not in ("TRUE", "FALSE") else 0
+            verification_cache.set(verification_key(prediction_query), final_result, ttl=ttl)
+        return final_result
+
+    async def _verify_prediction(self, prediction_query: str, search_query: Optional[str] = None) -> Dict:
         # Generate search query
-        search_query = self.generate_search_query(prediction_query)
+        search_query = search_query or await self.generate_search_query(prediction_query)
         # search_query = prediction_query
         print(f"Generated Search Query: {search_query}")
         logging.info(f"Generated Search Query: {search_query}")
-        # Fetch news articles
-        articles = self.fetch_news_articles(search_query)
-        # print("articles", articles)
-        # Fetch Google search results
-        google_results = self.fetch_google_results(search_query)
+        # Fetch news articles and Google search results concurrently
+        articles, google_results = await asyncio.gather(
+            self.fetch_news_articles(search_query),
+            self.fetch_google_results(search_query)
+        )
         
         # Prepare sources from both APIs
         all_sources = [
@@ -224,7 +342,7 @@ class PredictionVerifier:
         print("all_sources", len(all_sources))
         logging.info(f"Total sources found: {len(all_sources)}")
         # Analyze verification
-        verification_data = self.analyze_verification(prediction_query, all_sources)
+        verification_data = await self.analyze_verification(prediction_query, all_sources)
         print("Final result")
         logging.info("Final result")
         # Final result
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+import httpx
+
+logger = logging.getLogger("app")
+
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", "30"))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.environ.get("BREAKER_RESET_TIMEOUT", "60"))
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while an endpoint's circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream endpoint.
+
+    Opens after `failure_threshold` failed attempts in a row, fails fast for
+    `reset_timeout` seconds, then lets a single trial call through
+    (half-open) whose outcome closes or re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def abandon_trial(self):
+        """The call was cancelled before it said anything about the upstream; let another trial through."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._trial_in_flight:
+                    logger.info(f"Circuit breaker {self.name} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+        return _breakers[endpoint]
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Network errors, timeouts, 408/429/5xx responses and unparseable bodies are worth retrying."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return _status_code(error) in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, json.JSONDecodeError))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) from an HTTP error, if any."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, Retry-After support and per-endpoint circuit breakers.
+
+    `run` wraps async callables. It retries retryable errors and, when
+    `retry_if_result` says so, unusable results (e.g. an empty tweet list).
+    The last error is re-raised once attempts are exhausted; an unusable last
+    result is returned as-is.
+    """
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int, error: Optional[Exception] = None) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None if the server asks for longer than max_delay."""
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _next_step(self, endpoint: str, breaker: CircuitBreaker, attempt: int, max_attempts: int,
+                   error: Optional[Exception] = None) -> Optional[float]:
+        """Record the outcome of an attempt and decide whether (and how long) to wait for another."""
+        if error is not None:
+            if not is_retryable(error):
+                # A client error means the upstream itself is answering
+                breaker.record_success()
+                return None
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if attempt + 1 >= max_attempts:
+            return None
+        delay = self.backoff(attempt, error)
+        if delay is not None:
+            logger.info(f"{endpoint} attempt {attempt + 1} failed ({error or 'unusable result'}), retrying in {delay:.1f}s")
+        return delay
+
+    async def run(self, endpoint: str, fn: Callable, *args, retry_if_result: Optional[Callable[[Any], bool]] = None,
+                  max_attempts: Optional[int] = None, **kwargs) -> Any:
+        max_attempts = max_attempts or self.max_attempts
+        breaker = get_breaker(endpoint)
+        for attempt in range(max_attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit breaker for {endpoint} is open")
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_step(endpoint, breaker, attempt, max_attempts, e)
+                if delay is None:
+                    raise
+            except BaseException:
+                # Cancelled: otherwise a half-open breaker would wait forever for this trial
+                breaker.abandon_trial()
+                raise
+            else:
+                if retry_if_result is None or not retry_if_result(result):
+                    breaker.record_success()
+                    return result
+                delay = self._next_step(endpoint, breaker, attempt, max_attempts)
+                if delay is None:
+                    return result
+            await asyncio.sleep(delay)
+
+
+# Create a singleton instance
+retry_policy = RetryPolicy()
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import threading
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Callable
+
+logger = logging.getLogger("app")
+
+# Prediction verifications running at the same time, across every event loop in the process
+VERIFY_MAX_CONCURRENCY = int(os.environ.get("VERIFY_MAX_CONCURRENCY", "8"))
+
+
+class FairScheduler:
+    """Runs coroutines with a process-wide concurrency limit and round-robin fairness across keys.
+
+    Each key (e.g. a Twitter handle) has its own FIFO queue. When a slot
+    frees up, the next key in rotation gets it, so one handle with 60
+    predictions can't starve a handle with 3 queued behind it. The limit is
+    shared by every event loop (each agent tool call and Streamlit session
+    runs its own): state sits behind a threading.Lock and waiters on other
+    loops are woken with call_soon_threadsafe.
+    """
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.active = 0
+        # key -> (loop, future) waiters; keys are served in rotation
+        self._queues = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def acquire(self, key: str = ""):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.max_concurrency and not self._queues:
+                self.active += 1
+                return
+            waiter = loop.create_future()
+            self._queues.setdefault(key, deque()).append((loop, waiter))
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                queue = self._queues.get(key)
+                if queue is not None and (loop, waiter) in queue:
+                    # Still queued, nothing to give back
+                    queue.remove((loop, waiter))
+                    if not queue:
+                        del self._queues[key]
+                    raise
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted just as we were cancelled; hand it on
+                self.release()
+            # Otherwise the pending wake-up sees the cancelled waiter and hands the slot on
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._queues:
+                key, queue = self._queues.popitem(last=False)
+                loop, waiter = queue.popleft()
+                if queue:
+                    # Back of the rotation
+                    self._queues[key] = queue
+                try:
+                    # The slot passes straight to the waiter, so `active` stays the same
+                    loop.call_soon_threadsafe(self._wake, waiter)
+                    return
+                except RuntimeError:
+                    # That waiter's loop has closed
+                    continue
+            self.active -= 1
+
+    def _wake(self, waiter: asyncio.Future):
+        if waiter.cancelled():
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    async def run(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """Wait for a slot in `key`'s turn, then await fn(*args, **kwargs)."""
+        await self.acquire(key)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            self.release()
+
+
+class ProcessLimit(FairScheduler):
+    """`async with` concurrency limit shared by every event loop in the process."""
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+# Create a singleton instance
+verification_scheduler = FairScheduler("verification", VERIFY_MAX_CONCURRENCY)
@@ -0,0 +1,69 @@
+import asyncio
+import concurrent.futures
+import copy
+import threading
+import logging
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger("app")
+
+
+# Handed to followers when the leader is cancelled, so they retry instead of being cancelled too
+_LEADER_CANCELLED = object()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call.
+
+    The first caller for a key runs `fn`; everyone arriving while it runs
+    awaits the same outcome instead of starting their own. A thread-safe
+    concurrent.futures.Future carries the result, so callers on different
+    event loops (one per Streamlit session) are coalesced too.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                is_leader = future is None
+                if is_leader:
+                    future = concurrent.futures.Future()
+                    self._calls[key] = future
+
+            if is_leader:
+                break
+
+            logger.info(f"{self.name}: joining in-flight call for {key}")
+            result = await asyncio.wrap_future(future)
+            if result is _LEADER_CANCELLED:
+                # The leader's caller went away, not the call itself; try again
+                logger.info(f"{self.name}: in-flight call for {key} was cancelled, retrying")
+                continue
+            # Followers get their own copy so nobody mutates the leader's result
+            return copy.deepcopy(result)
+
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            # Unregister first so a retrying follower becomes the new leader
+            self._forget(key, future)
+            future.set_result(_LEADER_CANCELLED)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._forget(key, future)
+
+    def _forget(self, key: str, future: concurrent.futures.Future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
@@ -0,0 +1,114 @@
+import re
+import logging
+from typing import Dict, List
+import numpy as np
+
+logger = logging.getLogger("app")
+
+OTHER_TOPIC = "other"
+
+# Polymarket-style categories; keywords are matched as lowercase unigrams or bigrams
+TOPIC_KEYWORDS = {
+    "politics": [
+        "election", "elections", "vote", "votes", "voting", "voters", "ballot", "poll", "polls", "polling",
+        "president", "presidential", "senate", "senator", "congress", "governor", "mayor",
+        "campaign", "candidate", "nominee", "democrat", "democrats", "republican", "republicans",
+        "gop", "dnc", "rnc", "trump", "biden", "harris", "vance", "walz", "desantis", "newsom", "obama",
+        "parliament", "prime minister", "white house", "supreme court", "impeachment", "electoral",
+        "swing state", "swing states", "cabinet", "legislation",
+    ],
+    "crypto": [
+        "crypto", "cryptocurrency", "bitcoin", "btc", "ethereum", "eth", "solana", "sol", "xrp", "doge",
+        "dogecoin", "altcoin", "altcoins", "memecoin", "memecoins", "token", "tokens", "blockchain", "defi",
+        "nft", "nfts", "stablecoin", "usdt", "usdc", "binance", "coinbase", "halving", "onchain", "airdrop",
+        "etf inflows", "spot etf", "satoshi", "web3", "bull run", "altseason",
+    ],
+    "finance": [
+        "stock", "stocks", "stock market", "s&p", "spx", "nasdaq", "dow", "equities", "shares",
+        "earnings", "ipo", "valuation", "bonds", "treasury", "yields", "yield", "gold", "oil", "nvda",
+        "tsla", "aapl", "rally", "crash", "correction", "bull", "bear", "portfolio", "hedge fund", "etf",
+    ],
+    "economy": [
+        "economy", "economic", "recession", "inflation", "cpi", "gdp", "unemployment", "jobs report",
+        "fed chair", "fed rate", "fed meeting", "federal reserve", "powell", "rate cut", "rate cuts", "rate hike", "interest rate",
+        "interest rates", "fomc", "tariff", "tariffs", "deficit", "debt ceiling", "stimulus", "housing",
+    ],
+    "sports": [
+        "nfl", "nba", "mlb", "nhl", "ufc", "fifa", "super bowl", "world cup", "champions league",
+        "premier league", "olympics", "playoffs", "finals", "championship", "mvp",
+        "coach", "quarterback", "touchdown", "league", "tournament",
+        "f1", "formula 1", "tennis", "wimbledon", "boxing",
+    ],
+    "technology": [
+        "ai", "agi", "openai", "chatgpt", "gpt", "llm", "llms", "anthropic", "google",
+        "apple", "microsoft", "meta", "nvidia", "tesla", "spacex", "starship", "iphone", "chip", "chips",
+        "semiconductor", "robotics", "robot", "self driving", "software", "startup", "tech", "quantum",
+    ],
+    "geopolitics": [
+        "war", "ukraine", "russia", "putin", "zelensky", "israel", "gaza", "hamas", "iran", "china",
+        "taiwan", "xi", "nato", "ceasefire", "invasion", "sanctions", "military", "missile", "nuclear",
+        "north korea", "middle east", "peace deal", "troops", "conflict",
+    ],
+    "entertainment": [
+        "movie", "movies", "film", "box office", "oscars", "oscar", "grammys", "grammy", "emmys", "album",
+        "song", "billboard", "netflix", "disney", "taylor swift", "celebrity", "tv",
+        "spotify", "youtube", "tiktok", "mrbeast", "streamer",
+    ],
+    "science": [
+        "climate", "temperature", "hurricane", "earthquake", "weather", "covid", "pandemic", "vaccine",
+        "virus", "outbreak", "bird flu", "nasa", "mars", "moon landing", "asteroid", "health", "fda",
+    ],
+}
+
+TOPICS = list(TOPIC_KEYWORDS) + [OTHER_TOPIC]
+
+
+def _build_vocabulary() -> Dict[str, int]:
+    """Map every keyword (unigram or bigram) to the index of its topic."""
+    vocabulary = {}
+    for topic_index, keywords in enumerate(TOPIC_KEYWORDS.values()):
+        for keyword in keywords:
+            vocabulary.setdefault(keyword.lower(), topic_index)
+    return vocabulary
+
+
+_VOCABULARY = _build_vocabulary()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words plus bigrams; cashtags and hashtags match their bare keyword ($BTC -> btc)."""
+    text = re.sub(r"https?://\S+", " ", (text or "").lower())
+    words = [word.strip("$#'") for word in re.findall(r"[a-z0-9$#&']+", text)]
+    words = [word for word in words if word]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def topic_scores(texts: List[str]) -> np.ndarray:
+    """Per-tweet topic shares, shape (len(texts), len(TOPICS)).
+
+    Keyword hits are counted per topic and normalised so every tweet
+    contributes a total weight of 1; tweets without any hit count as "other".
+    """
+    rows = []
+    columns = []
+    for row, text in enumerate(texts):
+        for gram in tokenize(text):
+            topic_index = _VOCABULARY.get(gram)
+            if topic_index is not None:
+                rows.append(row)
+                columns.append(topic_index)
+
+    hits = np.zeros((len(texts), len(TOPICS)), dtype=np.float64)
+    np.add.at(hits, (np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64)), 1.0)
+    totals = hits.sum(axis=1)
+    hits[totals == 0, TOPICS.index(OTHER_TOPIC)] = 1.0
+    return hits / hits.sum(axis=1, keepdims=True)
+
+
+def topic_distribution(texts: List[str]) -> Dict[str, float]:
+    """Percentage of a user's predictions per topic, largest first; deterministic for the same tweets."""
+    if not texts:
+        return {}
+    shares = topic_scores(texts).mean(axis=0) * 100
+    order = np.argsort(-shares, kind="stable")
+    return {TOPICS[i]: round(float(shares[i]), 1) for i in order if shares[i] >= 0.05}
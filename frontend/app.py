@@ -73,6 +73,7 @@ client1  = OpenAIChatCompletionClient(
 )
 
 from backend.Agent import run_prediction_analysis
+from backend.HttpClient import http_client
 
 # --- Initialize Chat History in Session State ---
 INITIAL_MESSAGE = [
@@ -114,7 +115,8 @@ def run_async_function(coro):
         try:
             return loop.run_until_complete(coro)
         finally:
-            # Clean up any lingering async generators
+            # Close this loop's pooled HTTP client, then any lingering async generators
+            loop.run_until_complete(http_client.aclose())
             loop.run_until_complete(loop.shutdown_asyncgens())
             loop.close()
 
@@ -0,0 +1,58 @@
+import gc
+
+from openai import OpenAI
+
+from backend.HttpClient import HttpClient, LLM_TIMEOUT
+
+
+def test_run_closes_the_loop_client():
+    client = HttpClient()
+
+    async def use_client():
+        return client.get_async_client()
+
+    async_client = client.run(use_client())
+    gc.collect()
+    assert async_client.is_closed
+    assert len(client._async_clients) == 0
+
+
+def test_run_closes_the_loop_client_on_error():
+    client = HttpClient()
+
+    async def fail():
+        client.get_async_client()
+        raise ValueError("boom")
+
+    try:
+        client.run(fail())
+    except ValueError:
+        pass
+    gc.collect()
+    assert len(client._async_clients) == 0
+
+
+def test_one_client_per_loop():
+    client = HttpClient()
+
+    async def two_lookups():
+        return client.get_async_client() is client.get_async_client()
+
+    assert client.run(two_lookups())
+
+
+def test_openai_client_uses_the_loop_client():
+    client = HttpClient()
+    sync_openai = OpenAI(api_key="test", base_url="https://llm.example/v1")
+
+    async def lookups():
+        openai_client = client.openai_client(sync_openai)
+        assert openai_client is client.openai_client(sync_openai)
+        assert openai_client._client is client.get_async_client()
+        return openai_client
+
+    openai_client = client.run(lookups())
+    assert openai_client.timeout == LLM_TIMEOUT
+    assert str(openai_client.base_url) == "https://llm.example/v1/"
+    gc.collect()
+    assert len(client._openai_clients) == 0
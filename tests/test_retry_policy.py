@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend.RetryPolicy import CircuitBreaker, CircuitOpenError, RetryPolicy, get_breaker
+
+
+def make_breaker(name):
+    breaker = get_breaker(name)
+    breaker.failure_threshold = 2
+    breaker.reset_timeout = 0.05
+    return breaker
+
+
+def server_error():
+    request = httpx.Request("GET", "https://example.com")
+    return httpx.HTTPStatusError("503", request=request, response=httpx.Response(503, request=request))
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_timeout():
+    breaker = CircuitBreaker("transitions", failure_threshold=2, reset_timeout=0.05)
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    # Only one trial at a time
+    assert not breaker.allow()
+
+
+def test_half_open_trial_success_closes_and_failure_reopens():
+    breaker = CircuitBreaker("trial", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_open_breaker_fails_fast():
+    breaker = make_breaker("fail_fast")
+    policy = RetryPolicy(max_attempts=2, base_delay=0, max_delay=0)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise server_error()
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(policy.run("fail_fast", failing))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(policy.run("fail_fast", failing))
+    assert len(calls) == 2
+
+
+def test_cancelled_half_open_trial_lets_the_next_trial_through():
+    breaker = make_breaker("cancelled_trial")
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.06)
+    policy = RetryPolicy(max_attempts=1)
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(policy.run("cancelled_trial", asyncio.sleep, 10))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+
+def test_client_errors_are_not_retried():
+    make_breaker("client_error")
+    policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+    request = httpx.Request("GET", "https://example.com")
+    calls = []
+
+    async def not_found():
+        calls.append(1)
+        raise httpx.HTTPStatusError("404", request=request, response=httpx.Response(404, request=request))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(policy.run("client_error", not_found))
+    assert len(calls) == 1
+    assert get_breaker("client_error").state == "closed"
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+
+from backend.Scheduler import FairScheduler, ProcessLimit
+
+
+def test_round_robin_across_keys():
+    scheduler = FairScheduler("round_robin", 2)
+    order = []
+
+    async def job(key):
+        await asyncio.sleep(0.01)
+        order.append(key)
+
+    async def main():
+        tasks = [asyncio.ensure_future(scheduler.run("a", job, "a")) for _ in range(6)]
+        tasks += [asyncio.ensure_future(scheduler.run("b", job, "b")) for _ in range(2)]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert "".join(order) == "aaababaa"
+    assert scheduler.active == 0
+
+
+def test_cancelled_waiters_give_their_slot_back():
+    scheduler = FairScheduler("cancelled", 1)
+
+    async def main():
+        tasks = [asyncio.ensure_future(scheduler.run("a", asyncio.sleep, 0.01)) for _ in range(4)]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        tasks[2].cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+    assert scheduler.active == 0
+
+
+def test_limit_is_shared_across_event_loops():
+    limit = ProcessLimit("shared", 2)
+    peak = [0, 0]
+    lock = threading.Lock()
+
+    async def call():
+        async with limit:
+            with lock:
+                peak[0] += 1
+                peak[1] = max(peak)
+            await asyncio.sleep(0.02)
+            with lock:
+                peak[0] -= 1
+
+    async def session():
+        await asyncio.gather(*(call() for _ in range(5)))
+
+    # One loop per thread, like one per Streamlit session or tool call
+    threads = [threading.Thread(target=asyncio.run, args=(session(),)) for _ in range(4)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[1] == 2
+    assert limit.active == 0
+    assert time.monotonic() - start >= 0.02 * 20 / 2
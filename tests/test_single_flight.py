@@ -0,0 +1,46 @@
+import asyncio
+
+from backend.SingleFlight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight("shared")
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return {"key": key}
+
+    async def main():
+        return await asyncio.gather(*(flights.do("a", fetch, "a") for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert calls == ["a"]
+    assert results == [{"key": "a"}] * 3
+    assert flights._calls == {}
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flights = SingleFlight("cancelled")
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do("a", fetch, "a"))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("a", fetch, "a"))
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        return results
+
+    leader_result, follower_result = asyncio.run(main())
+    assert isinstance(leader_result, asyncio.CancelledError)
+    assert follower_result == "a"
+    assert calls == ["a", "a"]
+    assert flights._calls == {}
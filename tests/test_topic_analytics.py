@@ -0,0 +1,27 @@
+from backend.TopicAnalytics import topic_distribution
+
+
+def test_polymarket_odds_are_not_crypto():
+    assert topic_distribution(["Polymarket has Trump at 60% to win the election"]) == {"politics": 100.0}
+
+
+def test_shares_split_within_a_tweet_and_sum_to_100():
+    distribution = topic_distribution(["Lakers win the NBA finals, bitcoin up", "random thought"])
+    assert distribution == {"other": 50.0, "sports": 33.3, "crypto": 16.7}
+
+
+def test_no_tweets():
+    assert topic_distribution([]) == {}
+
+
+def test_prediction_market_odds_are_not_finance():
+    distribution = topic_distribution([
+        "The market has Trump at 60% in the prediction market",
+        "Market odds say the Senate flips",
+    ])
+    assert distribution == {"politics": 100.0}
+
+
+def test_generic_words_do_not_pick_a_topic():
+    distribution = topic_distribution(["Solana to the moon", "I'm fed up, new season same team, goal is policy"])
+    assert distribution == {"crypto": 50.0, "other": 50.0}